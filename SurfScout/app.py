@@ -1,225 +1,383 @@
 import os
+import time
+from datetime import datetime
+from functools import wraps
 import streamlit as st
-import requests
-from dotenv import load_dotenv
-from openai import OpenAI
+import config  # noqa: F401  (loads .env)
+import history
+import prefetch
+import willyweather
+from assessment import FAILED_EXPLANATION, cached_explanation, is_quota_error, warm_openai
+from deadline import Deadline, DeadlineExceeded, stream_within
+from metrics import separate_trace, span, stage_seconds, start_trace, timed
+from ratelimit import RateLimitExceeded
+from willyweather import WillyWeatherError
 
-# Load environment variables from .env file
-load_dotenv()
+# Heavy dependencies (openai, httpx, numpy) are imported inside the
+# functions that need them so the first render doesn't wait on them
 
 # Get API keys from environment variables
 WILLYWEATHER_API_KEY = os.getenv("WILLYWEATHER_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Initialize OpenAI client
-# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-# do not change this unless explicitly requested by the user
-openai = OpenAI(api_key=OPENAI_API_KEY)
+# Beaches fetched at once in compare mode
+COMPARE_CONCURRENCY = int(os.getenv("SURFSCOUT_COMPARE_CONCURRENCY", "8"))
 
-def search_beach(beach_name):
-    """Search for a beach in the WillyWeather API"""
-    # Updated URL format based on WillyWeather API documentation
-    url = f"https://api.willyweather.com.au/v2/{WILLYWEATHER_API_KEY}/search.json"
-    params = {
-        "query": beach_name,
-        "limit": 5
-        # Removed 'types' parameter as it's not supported according to API error
-    }
+# Number of sessions listed by the best-session finder
+BEST_SESSIONS = int(os.getenv("SURFSCOUT_BEST_SESSIONS", "5"))
+
+# Show per-stage timings for the current run in the sidebar
+DEBUG_PANEL = os.getenv("SURFSCOUT_DEBUG_PANEL", "").lower() in ("1", "true", "yes")
+
+def search_beach(beach_name, budget=None):
+    """Search for a beach in the WillyWeather API (returns [] on error)
+    
+    With a budget (seconds), gives up waiting once it runs out; the search
+    carries on in the background and its results are cached for the next rerun.
+    """
+    import async_client
     
     try:
-        # No need to display this debug message in production
-        # st.write(f"Searching for: {beach_name}")
-        
-        # Add headers for API authentication
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-        
-        # Debug the URL we're calling
-        debug_url = f"{url}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
-        # st.info(f"Calling Search API: {debug_url}")
-        
-        response = requests.get(url, params=params, headers=headers)
-        
-        if response.status_code != 200:
-            st.error(f"API Error: {response.status_code} - {response.text}")
-            return []
-            
-        # If response is too small, it might indicate an auth or format issue    
-        if len(response.text) < 50:
-            st.warning(f"Unusually small search API response: {response.text}")
-            
-        data = response.json()
-        
-        # Check response format - WillyWeather API returns a direct list of locations
-        if isinstance(data, list):
-            # The API directly returns a list of locations
-            locations = data
-        elif "search" in data:
-            # Fall back to old format if present
-            locations = data["search"]
-        else:
-            st.error(f"Unexpected API response format: {data}")
-            return []
-            
-        # Filter for Australian locations - most locations should be in Australia already
-        # but we can filter by checking region, state, or timeZone
-        australian_locations = [loc for loc in locations 
-                              if (loc.get("state") in ["NSW", "QLD", "VIC", "SA", "WA", "TAS", "NT", "ACT"] or
-                                 "australia" in loc.get("timeZone", "").lower())]
-        
-        return australian_locations
-    except requests.exceptions.RequestException as e:
+        return async_client.search_beach_sync(beach_name, budget)
+    except (WillyWeatherError, RateLimitExceeded, DeadlineExceeded) as e:
         st.error(f"Error searching for beach: {str(e)}")
         return []
 
-def get_surf_conditions(location_id):
-    """Get surf conditions (tide, swell, wind) for a location"""
-    url = f"https://api.willyweather.com.au/v2/{WILLYWEATHER_API_KEY}/locations/{location_id}/weather.json"
-    params = {
-        "forecasts": "tides,wind,swell",  # API expects comma-separated string, not list
-        "days": 1
-    }
+def get_surf_conditions(location_id, budget=None):
+    """Get surf conditions (tide, swell, wind) for a location right now (returns None on error)"""
+    import async_client
     
     try:
-        # Add headers for API authentication
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-        
-        # Debug the URL we're calling
-        debug_url = f"{url}?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
-        # st.info(f"Calling API: {debug_url}")
-        
-        response = requests.get(url, params=params, headers=headers)
-        
-        if response.status_code != 200:
-            st.error(f"Weather API Error: {response.status_code} - {response.text}")
-            return None
-            
-        # If response is too small, it might indicate an auth or format issue
-        if len(response.text) < 100:
-            st.warning(f"Unusually small API response, might indicate an issue: {response.text}")
-            
-        data = response.json()
-        
-        # Debug data structure if needed
-        # st.write("API Response Structure:")
-        # st.json(data)
-        
-        # Check if we have valid data
-        if not isinstance(data, dict) or "forecasts" not in data:
-            st.error("Unexpected weather API response format. Could not find forecast data.")
-            st.info("Response data structure:")
-            st.json(data)
-            return None
-        
-        # Extract tide information
-        tides_data = data.get("forecasts", {}).get("tides", {})
-        tides = []
-        if tides_data and "days" in tides_data and tides_data["days"]:
-            tides = tides_data["days"][0].get("entries", [])
-        
-        current_tide = None
-        tide_type = "Unknown"
-        if tides:
-            # Get closest tide information to current time
-            current_tide = tides[0].get("height")
-            tide_type = tides[0].get("type", "Unknown")
-        
-        # Extract wind information
-        wind_entries = []
-        wind_data = data.get("forecasts", {}).get("wind", {})
-        if wind_data and "days" in wind_data and wind_data["days"]:
-            wind_entries = wind_data["days"][0].get("entries", [])
-        
-        current_wind = None
-        wind_direction = None
-        if wind_entries:
-            # Get current wind information
-            current_wind = wind_entries[0].get("speed")
-            wind_direction = wind_entries[0].get("direction")
-        
-        # Extract swell information
-        swell_entries = []
-        swell_data = data.get("forecasts", {}).get("swell", {})
-        if swell_data and "days" in swell_data and swell_data["days"]:
-            swell_entries = swell_data["days"][0].get("entries", [])
-        
-        current_swell = None
-        swell_direction = None
-        if swell_entries:
-            # Get current swell information
-            current_swell = swell_entries[0].get("height")
-            swell_direction = swell_entries[0].get("direction")
-        
-        # Create a structured response
-        conditions = {
-            "tide": {
-                "height": current_tide if current_tide is not None else 0,
-                "type": tide_type
-            },
-            "wind": {
-                "speed": current_wind if current_wind is not None else 0,
-                "direction": wind_direction if wind_direction is not None else 0
-            },
-            "swell": {
-                "height": current_swell if current_swell is not None else 0,
-                "direction": swell_direction if swell_direction is not None else 0
-            }
-        }
-        
-        return conditions
-    except requests.exceptions.RequestException as e:
+        return async_client.get_surf_conditions_sync(location_id, budget)
+    except (WillyWeatherError, RateLimitExceeded, DeadlineExceeded) as e:
         st.error(f"Error fetching surf conditions: {str(e)}")
         return None
 
-def assess_surf_quality(conditions, beach_name):
-    """Assess surf quality using OpenAI's GPT-4o model"""
+def assess_surf_quality(conditions, beach_name, score=None, budget=None, location=None):
+    """Score conditions locally and ask OpenAI's GPT-4o model to explain the score
+    
+    With a budget (seconds), gives up waiting once it runs out and returns the
+    score with pending=True; the explanation is cached when it arrives.
+    """
+    import async_client
+    from scoring import score_conditions
+    
+    if score is None:
+        score = score_conditions(conditions)
+    
     if not OPENAI_API_KEY:
         st.error("OpenAI API key not found. Please add it to your .env file as OPENAI_API_KEY.")
-        return {"score": None, "explanation": "OpenAI API key is required for surf quality assessment."}
+        return {"score": score, "explanation": "OpenAI API key is required for surf quality explanations."}
     
     try:
-        # Detailed prompt for ChatGPT to evaluate surf conditions
-        prompt = (
-            f"You are an expert surfer with deep knowledge of Australian surf conditions. "
-            f"Please analyze the following surf conditions for {beach_name}:\n\n"
-            f"Tide: {conditions['tide']['height']} meters, type: {conditions['tide']['type']}\n"
-            f"Wind: {conditions['wind']['speed']} km/h, direction: {conditions['wind']['direction']}°\n"
-            f"Swell: {conditions['swell']['height']} meters, direction: {conditions['swell']['direction']}°\n\n"
-            f"Based on these conditions, give me a surf quality score from 0-10 (0 being terrible, 10 being perfect) "
-            f"and a one-paragraph explanation justifying the score. Consider how these conditions affect wave quality, "
-            f"ride-ability, and overall surf experience. Reply in JSON format with keys 'score' and 'explanation'."
-        )
-        
-        # Here's the actual API call to OpenAI
-        response = openai.chat.completions.create(
-            model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024
-            messages=[
-                {"role": "system", "content": "You are a surf conditions expert focusing on Australian beaches."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}  # Ensures we get a valid JSON response
-        )
-        
-        # Processing the response
-        result = response.choices[0].message.content
-        import json
-        surf_assessment = json.loads(result)
-        
-        return surf_assessment
+        return async_client.assess_surf_quality_sync(conditions, beach_name, score, location=location, budget=budget)
+    except DeadlineExceeded:
+        return {"score": score, "explanation": None, "pending": True}
     except Exception as e:
-        error_message = str(e)
-        if "429" in error_message or "quota" in error_message.lower():
-            st.error("OpenAI API quota exceeded. Please check your billing details or try again later.")
-            st.warning("Your OpenAI API key has reached its usage limit. Please visit https://platform.openai.com/ to check your usage and billing settings.")
+        show_openai_error(e)
+        return {"score": score, "explanation": FAILED_EXPLANATION}
+
+def _start_explanation(emit, conditions, beach_name, score, location=None):
+    """Start streaming an explanation on the async_client loop, returning its future (no st calls)"""
+    import async_client
+    
+    return async_client.submit(
+        async_client.assess_surf_quality(conditions, beach_name, score, location=location, emit=emit))
+
+def stream_assessment(conditions, beach_name, score, budget=None, location=None):
+    """Write the explanation to the page as GPT-4o streams it, returning the assessment
+    
+    Returns the same dict as assess_surf_quality, but the first words appear a
+    few hundred milliseconds in instead of once the whole completion is done.
+    """
+    explanation = cached_explanation(conditions, beach_name, score)
+    if explanation is not None:
+        st.write(f"**Why:** {explanation}")
+        return {"score": score, "explanation": explanation}
+    
+    assessment = {"score": score, "explanation": ""}
+    started = time.perf_counter()
+    
+    def pieces():
+        yield "**Why:** "
+        try:
+            for text in stream_within(budget, _start_explanation, conditions, beach_name, score, location):
+                if not assessment["explanation"]:
+                    # How long users wait before there's something to read
+                    stage_seconds.observe(time.perf_counter() - started, "assess_first_text")
+                assessment["explanation"] += text
+                yield text
+        except DeadlineExceeded:
+            assessment["pending"] = True
+            yield " …"
+        except Exception as e:
+            assessment["error"] = e
+            assessment["explanation"] = FAILED_EXPLANATION
+            yield FAILED_EXPLANATION
+    
+    st.write_stream(pieces())
+    if "error" in assessment:
+        show_openai_error(assessment.pop("error"))
+    return assessment
+
+def show_openai_error(error):
+    """Explain a failed OpenAI call to the user"""
+    if is_quota_error(error):
+        st.error("OpenAI API quota exceeded. Please check your billing details or try again later.")
+        st.warning("Your OpenAI API key has reached its usage limit. Please visit https://platform.openai.com/ to check your usage and billing settings.")
+    else:
+        st.error(f"Error accessing OpenAI API: {str(error)}")
+
+def score_emoji(score):
+    """Emoji indicator for a 0-10 surf score"""
+    if score >= 7:
+        return "🔥"
+    elif score >= 4:
+        return "🙂"
+    return "👎"
+
+def location_label(location):
+    """Display name for a search result"""
+    return f"{location.name}, {location.region}"
+
+def fetch_concurrently(fetch_many, named_locations):
+    """Run an async_client fetch_many over named locations, warning about any that fail"""
+    import async_client
+    
+    names = list(named_locations)
+    location_ids = [named_locations[name].id for name in names]
+    # Total time is close to the slowest single beach rather than the sum of them all
+    results = async_client.run(fetch_many(location_ids, COMPARE_CONCURRENCY))
+    
+    fetched = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            st.warning(f"Could not fetch surf conditions for {name}: {result}")
         else:
-            st.error(f"Error accessing OpenAI API: {error_message}")
+            fetched[name] = result
+    return fetched
+
+@timed("compare")
+def compare_beaches(named_locations):
+    """Fetch and score several beaches concurrently, returning table rows best first"""
+    import async_client
+    from scoring import score_many
+    
+    fetched = fetch_concurrently(async_client.get_many_surf_conditions, named_locations)
+    if not fetched:
+        return []
+    
+    scores = score_many(list(fetched.values()))
+    rows = [
+        {
+            "Beach": name,
+            "Score": float(score),
+            "Swell (m)": conditions.swell_height,
+            "Wind (km/h)": conditions.wind_speed,
+            "Tide (m)": conditions.tide_height,
+        }
+        for (name, conditions), score in zip(fetched.items(), scores)
+    ]
+    rows.sort(key=lambda row: row["Score"], reverse=True)
+    return rows
+
+@timed("best_sessions")
+def best_sessions(named_locations, days):
+    """Find the best upcoming surf sessions across several beaches, as table rows"""
+    import async_client
+    from sessions import find_best_sessions
+    
+    forecasts = fetch_concurrently(async_client.get_many_forecasts, named_locations)
+    sessions = find_best_sessions(forecasts, days=days, k=BEST_SESSIONS)
+    
+    rows = []
+    for session in sessions:
+        # Show times in the beach's own time zone
+        tz = willyweather.location_timezone(forecasts[session["beach"]].location.timeZone)
+        start = datetime.fromtimestamp(session["start"], tz)
+        end = datetime.fromtimestamp(session["end"], tz)
+        rows.append({
+            "Beach": session["beach"],
+            "When": f"{start:%a %d %b %H:%M}–{end:%H:%M}",
+            "Score": session["score"],
+        })
+    return rows
+
+def search_locations(beach_name):
+    """Search results for the query, kept in session state so reruns don't search again"""
+    search = st.session_state.get("search")
+    if search is not None and search["query"] == beach_name:
+        return search["locations"]
+    
+    with st.spinner("Searching for beach..."):
+        locations = search_beach(beach_name, Deadline().budget("search"))
+    # Failed or empty searches aren't kept, so the next rerun tries again
+    if locations:
+        st.session_state["search"] = {"query": beach_name, "locations": locations}
+    return locations
+
+def check_surf_quality(location, beach_name):
+    """Fetch and score a beach's conditions, returning a report for session state (None on error)"""
+    from scoring import score_conditions
+    
+    # Popular beaches get kept warm in the background
+    prefetch.record_lookup(location.id, beach_name)
+    
+    # Conditions and the explanation share one overall deadline
+    deadline = Deadline()
+    with st.spinner("Fetching surf conditions..."):
+        conditions = get_surf_conditions(location.id, deadline.budget("conditions"))
+    if not conditions:
+        return None
+    
+    return {
+        "beach": beach_name,
+        "location": location,
+        "conditions": conditions,
+        # The local score is ready instantly, so it's shown before asking the LLM
+        "score": score_conditions(conditions),
+        "explanation": None,
+        "pending": False,
+        "budget": deadline.budget("assess"),
+    }
+
+def render_report(report):
+    """Score, explanation and conditions for a checked beach, streaming the explanation if it's new"""
+    conditions = report["conditions"]
+    
+    # Display the results
+    st.header("Surf Quality Assessment")
+    st.subheader(f"Score: {report['score']}/10 {score_emoji(report['score'])}")
+    
+    if report["explanation"] is None and not report["pending"]:
+        # A new report: the explanation is written out as it streams in
+        assessment = stream_assessment(conditions, report["beach"], report["score"], budget=report["budget"],
+                                       location=report["location"])
+        if assessment.get("pending"):
+            report["pending"] = True
+        else:
+            report["explanation"] = assessment["explanation"]
+    else:
+        if report["pending"]:
+            # A completion that outlived its budget lands in the cache; picking it up costs no API call
+            explanation = cached_explanation(conditions, report["beach"], report["score"])
+            if explanation is not None:
+                report.update(explanation=explanation, pending=False)
+        if report["explanation"] is not None:
+            st.write(f"**Why:** {report['explanation']}")
+    
+    if report["pending"]:
+        # The score and conditions are still worth showing without the rest of the explanation
+        st.info("⏳ The explanation is taking longer than usual. It'll be ready in a moment.")
+        st.button("🔄 Refresh explanation")
+    
+    # Display surf conditions
+    st.subheader("Current Conditions")
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Tide", f"{conditions.tide_height} m")
+    with col2:
+        st.metric("Wind", f"{conditions.wind_speed} km/h")
+    with col3:
+        st.metric("Swell", f"{conditions.swell_height} m")
+
+def debug_fragment(fn):
+    """st.fragment that, with the debug panel on, ends with a breakdown of its own run's timings
+    
+    Fragment reruns skip the page-level panel in the sidebar, so each fragment
+    shows its timings (a fresh trace per run) in an expander instead.
+    """
+    @st.fragment
+    @wraps(fn)
+    def fragment(*args, **kwargs):
+        if not DEBUG_PANEL:
+            return fn(*args, **kwargs)
+        with separate_trace(fn.__name__) as trace:
+            fn(*args, **kwargs)
+        with st.expander("⏱️ Timings"):
+            st.dataframe(timing_rows(trace), hide_index=True, use_container_width=True)
+    return fragment
+
+@debug_fragment
+def render_results(locations):
+    """Beach picker and surf report
+    
+    A fragment: picking a beach or checking it reruns only this function, never
+    the search above it. The last report is kept in session state.
+    """
+    # Create a list of location names
+    location_names = [location_label(loc) for loc in locations]
+    
+    # Let user select a location
+    selected_location = st.selectbox("Select a beach:", location_names)
+    location = locations[location_names.index(selected_location)]
+    
+    if st.button("⭐ Add to favourites"):
+        favourites = st.session_state.setdefault("favourites", {})
+        favourites[selected_location] = location
+        # Compare mode lists favourites, so redraw the whole page (the search comes from session state)
+        st.rerun()
+    
+    if st.button("Check Surf Quality"):
+        st.session_state["report"] = check_surf_quality(location, selected_location)
+    
+    report = st.session_state.get("report")
+    if report is not None and report["beach"] == selected_location:
+        render_report(report)
+
+@debug_fragment
+def render_compare(locations):
+    """Compare mode: rank several search results and favourites side by side"""
+    candidates = {location_label(loc): loc for loc in locations}
+    candidates.update(st.session_state.get("favourites", {}))
+    if not candidates:
+        return
+    
+    st.header("Compare Beaches")
+    chosen = st.multiselect("Select beaches to compare:", list(candidates))
+    if not chosen:
+        return
+    
+    chosen_locations = {name: candidates[name] for name in chosen}
+    
+    if len(chosen) > 1 and st.button("Compare Surf Quality"):
+        with st.spinner("Fetching and scoring beaches..."):
+            ranking = compare_beaches(chosen_locations)
         
-        return {"score": None, "explanation": "Could not assess surf quality due to an error with the OpenAI API."}
+        if ranking:
+            st.dataframe(ranking, hide_index=True, use_container_width=True)
+    
+    # When and where to surf over the coming days
+    days = st.slider("Days ahead:", 1, willyweather.FORECAST_DAYS, 1) if willyweather.FORECAST_DAYS > 1 else 1
+    if st.button("Find Best Sessions"):
+        with st.spinner("Ranking upcoming sessions..."):
+            sessions = best_sessions(chosen_locations, days)
+        
+        if sessions:
+            st.dataframe(sessions, hide_index=True, use_container_width=True)
+        else:
+            st.info("No forecast data available for the selected beaches.")
+
+def timing_rows(trace):
+    """Table rows showing where the time went in a traced run"""
+    total = trace[0]["seconds"]
+    # Whatever the top-level stages don't account for is Streamlit rendering and glue
+    stages = sum(entry["seconds"] for entry in trace if entry["depth"] == 1)
+    rows = [
+        {"Span": "\u2003" * entry["depth"] + entry["name"], "ms": round(entry["seconds"] * 1000, 1)}
+        for entry in trace
+    ]
+    rows.append({"Span": "rendering & other", "ms": round((total - stages) * 1000, 1)})
+    return rows
+
+def render_debug_panel(trace):
+    """Sidebar breakdown of where the time went in this run"""
+    if not trace:
+        return
+    with st.sidebar:
+        st.subheader("⏱️ Timings")
+        st.dataframe(timing_rows(trace), hide_index=True, use_container_width=True)
 
 def main():
     st.title("🏄‍♂️ Surf Quality Checker")
@@ -237,58 +395,25 @@ def main():
     # Input for beach name
     beach_name = st.text_input("Enter an Australian beach name:")
     
+    locations = []
     if beach_name:
-        with st.spinner("Searching for beach..."):
-            locations = search_beach(beach_name)
+        # An assessment is likely next, so load the OpenAI package while the user picks a beach
+        warm_openai()
+        
+        locations = search_locations(beach_name)
         
         if not locations:
             st.warning(f"No Australian beaches found with the name '{beach_name}'. Please try another name.")
         else:
-            # Create a list of location names
-            location_names = [f"{loc['name']}, {loc['region']}" for loc in locations]
-            
-            # Let user select a location
-            selected_location = st.selectbox("Select a beach:", location_names)
-            
-            if st.button("Check Surf Quality"):
-                # Find the selected location
-                selected_idx = location_names.index(selected_location)
-                location_id = locations[selected_idx]["id"]
-                
-                with st.spinner("Fetching surf conditions..."):
-                    conditions = get_surf_conditions(location_id)
-                
-                if conditions:
-                    with st.spinner("Analyzing surf quality..."):
-                        assessment = assess_surf_quality(conditions, selected_location)
-                    
-                    if assessment["score"] is not None:
-                        # Display the results
-                        st.header("Surf Quality Assessment")
-                        
-                        # Display score with emoji indicators
-                        score = float(assessment["score"])
-                        
-                        if score >= 7:
-                            emoji = "🔥"
-                        elif score >= 4:
-                            emoji = "🙂"
-                        else:
-                            emoji = "👎"
-                        
-                        st.subheader(f"Score: {score}/10 {emoji}")
-                        st.write(f"**Why:** {assessment['explanation']}")
-                        
-                        # Display surf conditions
-                        st.subheader("Current Conditions")
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.metric("Tide", f"{conditions['tide']['height']} m")
-                        with col2:
-                            st.metric("Wind", f"{conditions['wind']['speed']} km/h")
-                        with col3:
-                            st.metric("Swell", f"{conditions['swell']['height']} m")
+            render_results(locations)
+    
+    render_compare(locations)
 
 if __name__ == "__main__":
-    main()
+    prefetch.start()
+    history.start()
+    trace = start_trace()
+    with span("script_run"):
+        main()
+    if DEBUG_PANEL:
+        render_debug_panel(trace)
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import sys
+import threading
+
+import config  # noqa: F401  (loads .env)
+from cache import assessment_cache, baseline_cache, normalize_query
+from conditions import Conditions
+
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+OPENAI_MODEL = "gpt-4o"
+
+SYSTEM_PROMPT = "You are a surf conditions expert focusing on Australian beaches."
+
+FAILED_EXPLANATION = "Could not explain the surf score due to an error with the OpenAI API."
+
+# Per-request timeout and retries for OpenAI calls (the SDK would otherwise wait up to 10 minutes)
+OPENAI_TIMEOUT = float(os.getenv("SURFSCOUT_OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("SURFSCOUT_OPENAI_MAX_RETRIES", "2"))
+
+# Bucket widths used to quantize conditions for the assessment cache, so
+# near-identical readings (1.2 m @ 140° vs 1.25 m @ 142°) share one assessment
+TIDE_HEIGHT_BUCKET = float(os.getenv("SURFSCOUT_TIDE_HEIGHT_BUCKET", "0.25"))
+WIND_SPEED_BUCKET = float(os.getenv("SURFSCOUT_WIND_SPEED_BUCKET", "5"))
+SWELL_HEIGHT_BUCKET = float(os.getenv("SURFSCOUT_SWELL_HEIGHT_BUCKET", "0.25"))
+DIRECTION_BUCKET = float(os.getenv("SURFSCOUT_DIRECTION_BUCKET", "22.5"))
+
+# How far conditions must move from those a beach was last explained under
+# before the LLM is asked again; smaller moves keep the previous explanation
+RESCORE_TIDE_HEIGHT_CHANGE = float(os.getenv("SURFSCOUT_RESCORE_TIDE_HEIGHT_CHANGE", "0.5"))
+RESCORE_WIND_SPEED_CHANGE = float(os.getenv("SURFSCOUT_RESCORE_WIND_SPEED_CHANGE", "5"))
+RESCORE_SWELL_HEIGHT_CHANGE = float(os.getenv("SURFSCOUT_RESCORE_SWELL_HEIGHT_CHANGE", "0.3"))
+RESCORE_DIRECTION_CHANGE = float(os.getenv("SURFSCOUT_RESCORE_DIRECTION_CHANGE", "30"))
+RESCORE_SCORE_CHANGE = float(os.getenv("SURFSCOUT_RESCORE_SCORE_CHANGE", "1"))
+
+
+def _import_openai():
+    import openai  # noqa: F401
+
+
+def warm_openai():
+    """Import the openai package on a background thread so the first assessment doesn't wait for it
+
+    The package is slow to import, so it's only loaded once an assessment is
+    likely rather than on every Streamlit rerun.
+    """
+    if "openai" not in sys.modules:
+        threading.Thread(target=_import_openai, name="surfscout-openai-warmup", daemon=True).start()
+
+
+def build_prompt(conditions, beach_name, score):
+    """Detailed prompt for ChatGPT to explain the locally computed surf score"""
+    return (
+        f"You are an expert surfer with deep knowledge of Australian surf conditions. "
+        f"Please analyze the following surf conditions for {beach_name}:\n\n"
+        f"Tide: {conditions.tide_height} meters, type: {conditions.tide_type}\n"
+        f"Wind: {conditions.wind_speed} km/h, direction: {conditions.wind_direction}°\n"
+        f"Swell: {conditions.swell_height} meters, direction: {conditions.swell_direction}°\n\n"
+        f"Our surf model rates these conditions {score}/10 (0 being terrible, 10 being perfect). "
+        f"Write a one-paragraph explanation of that score. Consider how these conditions affect wave quality, "
+        f"ride-ability, and overall surf experience. Reply in JSON format with the key 'explanation'."
+    )
+
+
+def build_messages(conditions, beach_name, score):
+    """Chat messages asking for the explanation of a surf score"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_prompt(conditions, beach_name, score)}
+    ]
+
+
+def _bucket(value, width):
+    return round(float(value or 0) / width)
+
+
+def _direction_bucket(degrees, width):
+    # Wrap around so 355° and 5° land in the same bucket
+    return _bucket(degrees, width) % round(360 / width)
+
+
+def assessment_cache_key(conditions, beach_name):
+    """Cache key for an assessment: the beach plus bucketed tide, wind and swell"""
+    return (
+        normalize_query(beach_name),
+        _bucket(conditions.tide_height, TIDE_HEIGHT_BUCKET),
+        conditions.tide_type.lower(),
+        _bucket(conditions.wind_speed, WIND_SPEED_BUCKET),
+        _direction_bucket(conditions.wind_direction, DIRECTION_BUCKET),
+        _bucket(conditions.swell_height, SWELL_HEIGHT_BUCKET),
+        _direction_bucket(conditions.swell_direction, DIRECTION_BUCKET),
+    )
+
+
+def _angle_between(a, b):
+    difference = abs(float(a or 0) - float(b or 0)) % 360
+    return min(difference, 360 - difference)
+
+
+def material_changes(old, new, old_score, new_score):
+    """Names of the readings that moved past their re-scoring threshold between two sets of conditions"""
+    checks = {
+        "tide": abs(new.tide_height - old.tide_height) > RESCORE_TIDE_HEIGHT_CHANGE
+                or new.tide_type.lower() != old.tide_type.lower(),
+        "wind": abs(new.wind_speed - old.wind_speed) > RESCORE_WIND_SPEED_CHANGE
+                or _angle_between(new.wind_direction, old.wind_direction) > RESCORE_DIRECTION_CHANGE,
+        "swell": abs(new.swell_height - old.swell_height) > RESCORE_SWELL_HEIGHT_CHANGE
+                 or _angle_between(new.swell_direction, old.swell_direction) > RESCORE_DIRECTION_CHANGE,
+        # Small moves can still add up to a different score, which the old explanation wouldn't match
+        "score": abs(new_score - old_score) > RESCORE_SCORE_CHANGE,
+    }
+    return [name for name, changed in checks.items() if changed]
+
+
+def _baseline(conditions, beach_name, score):
+    """The beach's baseline if its explanation still applies to these conditions, else None"""
+    baseline = baseline_cache.get(normalize_query(beach_name))
+    # Compared with the beach's last explained conditions rather than the last
+    # fetch, so slow drift still adds up to a new explanation eventually
+    if baseline is None or material_changes(
+            Conditions.from_dict(baseline["conditions"]), conditions, baseline["score"], score):
+        return None
+    return baseline
+
+
+def cached_explanation(conditions, beach_name, score):
+    """An explanation still good for these conditions, or None if the LLM needs asking
+
+    Near-identical conditions hit the assessment cache; otherwise the beach's
+    last explanation is kept unless tide, wind, swell or the score have moved
+    past the RESCORE thresholds since it was written.
+    """
+    explanation = assessment_cache.get(assessment_cache_key(conditions, beach_name))
+    if explanation is not None:
+        return explanation
+    baseline = _baseline(conditions, beach_name, score)
+    return baseline["explanation"] if baseline is not None else None
+
+
+def explanation_ttl_remaining(conditions, beach_name, score):
+    """Seconds until no cached explanation applies to these conditions (None if none does now)"""
+    remaining = [assessment_cache.ttl_remaining(assessment_cache_key(conditions, beach_name))]
+    if _baseline(conditions, beach_name, score) is not None:
+        remaining.append(baseline_cache.ttl_remaining(normalize_query(beach_name)))
+    remaining = [seconds for seconds in remaining if seconds is not None]
+    return max(remaining) if remaining else None
+
+
+def remember_explanation(conditions, beach_name, score, explanation):
+    """Cache a fresh explanation and make its conditions the beach's new baseline"""
+    assessment_cache.set(assessment_cache_key(conditions, beach_name), explanation)
+    baseline_cache.set(normalize_query(beach_name),
+                       {"conditions": conditions.to_dict(), "score": score, "explanation": explanation})
+
+
+def parse_assessment(content, score):
+    """Combine the local score with the explanation from the JSON completion"""
+    return {"score": score, "explanation": json.loads(content).get("explanation", "")}
+
+
+# Where the explanation string starts in the JSON completion
+_EXPLANATION_START = re.compile(r'"explanation"\s*:\s*"')
+# The complete characters and escapes at the start of a JSON string body, stopping
+# at the closing quote or at an escape cut off by the end of a chunk
+_STRING_PREFIX = re.compile(r'(?:[^"\\]|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*')
+
+
+def _decode_partial_string(raw):
+    """Decode as much of a JSON string body (after the opening quote) as has arrived"""
+    text = json.loads(f'"{_STRING_PREFIX.match(raw).group()}"', strict=False)
+    # Half of a surrogate pair decodes on its own; wait for the other half
+    if text and "\ud800" <= text[-1] <= "\udbff":
+        text = text[:-1]
+    return text
+
+
+class ExplanationStream:
+    """Pull the explanation out of a streamed JSON completion as its chunks arrive"""
+
+    def __init__(self):
+        self.content = ""
+        self._emitted = 0
+
+    def feed(self, chunk):
+        """Add a chunk of the completion, returning any newly readable explanation text"""
+        self.content += chunk
+        match = _EXPLANATION_START.search(self.content)
+        if match is None:
+            return ""
+        text = _decode_partial_string(self.content[match.end():])
+        new = text[self._emitted:]
+        self._emitted = max(self._emitted, len(text))
+        return new
+
+
+def is_quota_error(error):
+    """Whether an OpenAI error means we've hit a rate limit or run out of quota"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    error_message = str(error)
+    return "429" in error_message or "quota" in error_message.lower()
@@ -0,0 +1,335 @@
+import asyncio
+import os
+import random
+import threading
+import weakref
+
+import httpx
+
+import config  # noqa: F401  (loads .env)
+import history
+import willyweather
+from assessment import (
+    OPENAI_MAX_RETRIES,
+    OPENAI_MODEL,
+    OPENAI_TIMEOUT,
+    ExplanationStream,
+    assessment_cache_key,
+    build_messages,
+    cached_explanation,
+    parse_assessment,
+    remember_explanation,
+)
+from cache import assessment_cache, baseline_cache, forecast_cache, normalize_query, run_blocking, search_cache
+from deadline import wait_within
+from forecast import parse_forecast
+from http_client import (
+    HTTP_BACKOFF_FACTOR,
+    HTTP_BACKOFF_JITTER,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRIES,
+    RETRY_STATUS_CODES,
+)
+from metrics import carry_trace, timed, upstream_call
+from ratelimit import (
+    RATE_LIMIT_RETRIES,
+    acquire_openai_async,
+    parse_retry_after,
+    record_openai,
+    throttle_openai,
+    willyweather_limiter,
+)
+from scoring import score_conditions
+from singleflight import inflight
+from willyweather import WillyWeatherError
+
+# Maximum number of upstream lookups in flight at once for the gather helpers
+ASYNC_CONCURRENCY = int(os.getenv("SURFSCOUT_ASYNC_CONCURRENCY", "10"))
+
+# Caches the assessment helpers read and write
+_EXPLANATION_CACHES = (assessment_cache, baseline_cache)
+
+# Connection errors worth retrying (refused, reset or dropped mid-response)
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError)
+
+# httpx and OpenAI async clients are bound to the event loop that created them,
+# so each running loop gets its own. The OpenAI one is only created once a loop
+# asks for a completion, so WillyWeather-only callers don't need an OpenAI key.
+_http_clients = weakref.WeakKeyDictionary()
+_openai_clients = weakref.WeakKeyDictionary()
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_http():
+    """Return the httpx async client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    http = _http_clients.get(loop)
+    if http is None:
+        http = _http_clients[loop] = httpx.AsyncClient(
+            headers=willyweather.REQUEST_HEADERS,
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+        )
+    return http
+
+
+def _get_openai():
+    """Return the OpenAI async client for the running event loop, created on first use"""
+    loop = asyncio.get_running_loop()
+    openai = _openai_clients.get(loop)
+    if openai is None:
+        # The openai package is slow to import, so load it only once a loop needs it
+        from openai import AsyncOpenAI
+        openai = _openai_clients[loop] = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"), timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+    return openai
+
+
+async def aclose():
+    """Close the async clients belonging to the running event loop (e.g. on server shutdown)"""
+    loop = asyncio.get_running_loop()
+    http = _http_clients.pop(loop, None)
+    if http is not None:
+        await http.aclose()
+    openai = _openai_clients.pop(loop, None)
+    if openai is not None:
+        await openai.close()
+
+
+async def _get_json(url, params, decode):
+    """GET and decode a WillyWeather URL, sharing the result with identical requests in flight"""
+    key = ("GET json", url, tuple(sorted(params.items())))
+    return await inflight.do_async(key, _fetch_json, url, params, decode)
+
+
+async def _fetch_json(url, params, decode):
+    """GET a WillyWeather URL with jittered retries on 5xx and dropped connections"""
+    http = _get_http()
+    attempt = throttled = 0
+    while True:
+        # RateLimitExceeded propagates so callers can tell our own limit from an upstream failure
+        await willyweather_limiter.acquire_async()
+        try:
+            with upstream_call("willyweather", willyweather.endpoint_name(url)) as call:
+                response = await http.get(url, params=params)
+                call["status"] = response.status_code
+        except _RETRYABLE_ERRORS as e:
+            if attempt == HTTP_RETRIES:
+                raise WillyWeatherError(f"Error contacting WillyWeather: {e}") from e
+        except httpx.HTTPError as e:
+            raise WillyWeatherError(f"Error contacting WillyWeather: {e}") from e
+        else:
+            willyweather_limiter.record(tokens=1)
+            if response.status_code == 429 and throttled < RATE_LIMIT_RETRIES:
+                # Pausing the shared bucket holds back every other caller too
+                willyweather_limiter.pause(parse_retry_after(response.headers.get("Retry-After")))
+                throttled += 1
+                continue
+            if response.status_code not in RETRY_STATUS_CODES or attempt == HTTP_RETRIES:
+                break
+        await asyncio.sleep(HTTP_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER))
+        attempt += 1
+
+    if response.status_code != 200:
+        raise WillyWeatherError(f"API Error: {response.status_code} - {response.text}")
+    return decode(response.content)
+
+
+@timed("search")
+async def search_beach(beach_name):
+    """Search for a beach in the WillyWeather API (raises WillyWeatherError or RateLimitExceeded)"""
+    query = normalize_query(beach_name)
+    if not query:
+        return []
+
+    locations = await run_blocking((search_cache,), search_cache.get, query)
+    if locations is not None:
+        return locations
+
+    api_key = os.getenv("WILLYWEATHER_API_KEY")
+    locations = await _get_json(
+        willyweather.search_url(api_key), willyweather.search_params(beach_name), willyweather.parse_search)
+    await run_blocking((search_cache,), search_cache.set, query, locations)
+    return locations
+
+
+@timed("forecast")
+async def get_forecast(location_id, refresh=False):
+    """Get a location's full multi-day forecast (raises WillyWeatherError or RateLimitExceeded)
+
+    refresh=True refetches every forecast type even if it's still cached.
+    """
+    data, missing = await run_blocking((forecast_cache,), willyweather.cached_weather, location_id)
+    if refresh:
+        missing = list(willyweather.SURF_FORECAST_TYPES)
+    if missing:
+        api_key = os.getenv("WILLYWEATHER_API_KEY")
+        fetched = await _get_json(
+            willyweather.weather_url(api_key, location_id), willyweather.weather_params(missing), willyweather.parse_weather)
+        data = willyweather.merge_weather(data, fetched)
+        await run_blocking((forecast_cache,), willyweather.cache_weather, location_id, fetched, missing)
+        history.record_forecast(location_id, fetched, missing)
+    return parse_forecast(data)
+
+
+@timed("conditions")
+async def get_surf_conditions(location_id):
+    """Get current surf conditions (tide, swell, wind) for a location (raises WillyWeatherError or RateLimitExceeded)"""
+    return (await get_forecast(location_id)).conditions_at()
+
+
+@timed("assess")
+async def assess_surf_quality(conditions, beach_name, score=None, refresh=False, location=None, emit=None):
+    """Score conditions locally and explain the score with the async OpenAI client (raises openai.OpenAIError)
+
+    refresh=True asks OpenAI again even if an explanation is still cached.
+    location (a Location, if known) tags the assessment in the history store.
+    emit (if given) is called with each new piece of the explanation as it
+    streams in; together the pieces make up the whole explanation.
+    """
+    if score is None:
+        score = score_conditions(conditions)
+
+    # The beach's earlier explanation is kept until its conditions materially change
+    explanation = None
+    if not refresh:
+        explanation = await run_blocking(_EXPLANATION_CACHES, cached_explanation, conditions, beach_name, score)
+    if explanation is not None:
+        if emit is not None:
+            emit(explanation)
+        return {"score": score, "explanation": explanation}
+
+    streamed = []
+
+    def collect(text):
+        streamed.append(text)
+        emit(text)
+
+    key = assessment_cache_key(conditions, beach_name)
+    # Sync and async callers asking about the same conditions share one completion
+    content = await inflight.do_async(("assessment",) + key, _complete, conditions, beach_name, score, location,
+                                      collect if emit is not None else None)
+    surf_assessment = parse_assessment(content, score)
+    await run_blocking(
+        _EXPLANATION_CACHES, remember_explanation, conditions, beach_name, score, surf_assessment["explanation"])
+
+    # Callers that shared someone else's completion get the whole explanation at the end
+    sent = "".join(streamed)
+    explanation = surf_assessment["explanation"]
+    if emit is not None and explanation.startswith(sent) and len(explanation) > len(sent):
+        emit(explanation[len(sent):])
+    return surf_assessment
+
+
+async def _complete(conditions, beach_name, score, location=None, emit=None):
+    """Ask GPT-4o to explain a score, returning the raw JSON completion
+
+    The completion is streamed, and emit (if given) is called with each new
+    piece of the explanation as soon as it can be read.
+    """
+    from openai import RateLimitError
+
+    # Queue behind the shared limiter rather than bursting past OpenAI's rate limits
+    await acquire_openai_async()
+    openai = _get_openai()
+    explanation = ExplanationStream()
+    usage = None
+    try:
+        with upstream_call("openai", "chat.completions") as call:
+            stream = await openai.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=build_messages(conditions, beach_name, score),
+                response_format={"type": "json_object"},  # Ensures we get a valid JSON response
+                stream=True,
+                stream_options={"include_usage": True}  # Usage comes in the final chunk
+            )
+            call["status"] = 200
+            async for chunk in stream:
+                usage = chunk.usage or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    text = explanation.feed(chunk.choices[0].delta.content)
+                    if text and emit is not None:
+                        emit(text)
+    except RateLimitError as e:
+        throttle_openai(e)
+        raise
+    record_openai(usage)
+    # Only the caller that made the call records it, so shared completions are written once
+    history.record_assessment(conditions, beach_name, score,
+                              parse_assessment(explanation.content, score)["explanation"], OPENAI_MODEL, location)
+    return explanation.content
+
+
+async def bounded_gather(coroutines, limit=ASYNC_CONCURRENCY):
+    """Await coroutines concurrently, at most limit at a time, returning results or exceptions in order"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_one(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run_one(c) for c in coroutines), return_exceptions=True)
+
+
+async def get_many_forecasts(location_ids, limit=ASYNC_CONCURRENCY):
+    """Fetch full forecasts for many locations concurrently on one event loop"""
+    return await bounded_gather([get_forecast(i) for i in location_ids], limit)
+
+
+async def get_many_surf_conditions(location_ids, limit=ASYNC_CONCURRENCY):
+    """Fetch conditions for many locations concurrently on one event loop"""
+    return await bounded_gather([get_surf_conditions(i) for i in location_ids], limit)
+
+
+def _get_loop():
+    """Return the shared background event loop, starting it on first use"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="surfscout-async", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run(coroutine, timeout=None):
+    """Run a coroutine from sync code (e.g. the Streamlit script thread) and return its result
+
+    Coroutines run on one long-lived background loop so the pooled connections
+    survive between calls instead of being torn down by asyncio.run()
+    """
+    return submit(coroutine).result(timeout)
+
+
+def submit(coroutine):
+    """Start a coroutine on the background loop from sync code, returning a concurrent.futures.Future"""
+    # carry_trace keeps the spans recorded on the loop in the calling run's trace
+    return asyncio.run_coroutine_threadsafe(carry_trace(coroutine), _get_loop())
+
+
+def search_beach_sync(beach_name, budget=None):
+    """Blocking wrapper around search_beach
+
+    With a budget (seconds), raises DeadlineExceeded once it runs out; the
+    search carries on in the background and caches its results.
+    """
+    return run(wait_within(budget, search_beach(beach_name)))
+
+
+def get_surf_conditions_sync(location_id, budget=None):
+    """Blocking wrapper around get_surf_conditions (budget works as in search_beach_sync)"""
+    return run(wait_within(budget, get_surf_conditions(location_id)))
+
+
+def assess_surf_quality_sync(conditions, beach_name, score=None, location=None, budget=None, emit=None):
+    """Blocking wrapper around assess_surf_quality (budget works as in search_beach_sync)
+
+    emit is called on the background loop's thread, so it must be thread-safe.
+    """
+    return run(wait_within(budget, assess_surf_quality(conditions, beach_name, score, location=location, emit=emit)))
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from openai import OpenAIError
+
+import async_client
+import history
+from ratelimit import RateLimitExceeded
+from scoring import score_conditions
+from willyweather import WillyWeatherError
+
+# Score a list of beaches from the command line, e.g.
+#
+#     python batch.py beaches.txt --parallel 20 > report.jsonl
+#     echo "Bondi Beach" | python batch.py --explain
+#
+# Each input line is a beach name (resolved to its top search result) or a
+# WillyWeather location id. One JSON object is written per line as soon as
+# that beach finishes, so output order follows completion, not input.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score a list of Australian beaches and write JSONL.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="file with one beach name or location id per line (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("-p", "--parallel", type=int, default=async_client.ASYNC_CONCURRENCY,
+                        help="beaches processed at once (default: %(default)s)")
+    parser.add_argument("--explain", action="store_true", help="also ask OpenAI to explain each score")
+    return parser.parse_args(argv)
+
+
+def read_lines(path):
+    """Non-empty, non-comment input lines"""
+    if path == "-":
+        return _clean_lines(sys.stdin)
+    with open(path, encoding="utf-8") as stream:
+        return _clean_lines(stream)
+
+
+def _clean_lines(stream):
+    return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith("#")]
+
+
+async def resolve(line):
+    """Turn an input line into a location id"""
+    if line.isdigit():
+        return int(line)
+    locations = await async_client.search_beach(line)
+    if not locations:
+        raise WillyWeatherError(f"No Australian beaches found with the name '{line}'")
+    return locations[0].id
+
+
+async def score_line(line, explain):
+    """Resolve, fetch and score one input line, returning its JSON record"""
+    record = {"input": line}
+    try:
+        forecast = await async_client.get_forecast(await resolve(line))
+        # The forecast names the location, so raw ids get a name and state too
+        location = forecast.location
+        record.update({key: getattr(location, key) for key in ("id", "name", "region", "state")
+                       if getattr(location, key) is not None})
+        conditions = forecast.conditions_at()
+        record["conditions"] = conditions.to_dict()
+        record["score"] = score_conditions(conditions)
+        if explain:
+            beach_name = location.name or line
+            assessment = await async_client.assess_surf_quality(conditions, beach_name, record["score"],
+                                                              location=location)
+            record["explanation"] = assessment["explanation"]
+    except (WillyWeatherError, OpenAIError, RateLimitExceeded) as e:
+        record["error"] = str(e)
+    return record
+
+
+async def run_batch(lines, output, parallel, explain):
+    """Process lines with bounded parallelism, writing each record as it completes"""
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def bounded(line):
+        async with semaphore:
+            return await score_line(line, explain)
+
+    failures = 0
+    history.start()
+    try:
+        for finished in asyncio.as_completed([bounded(line) for line in lines]):
+            record = await finished
+            failures += "error" in record
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        await async_client.aclose()
+        history.stop()
+    return failures
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    lines = read_lines(args.input)
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        failures = asyncio.run(run_batch(lines, output, max(1, args.parallel), args.explain))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if failures:
+        print(f"{failures} of {len(lines)} beaches failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
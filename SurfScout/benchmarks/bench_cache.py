@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Cache backend benchmark: get/set latency of the memory, SQLite and Redis
+# backends. Redis runs against the local stand-in in mock_redis.py unless
+# --redis-url points at a real server. Behaviour is covered by tests/test_cache.py.
+#
+#     python benchmarks/bench_cache.py
+#     python benchmarks/bench_cache.py --redis-url redis://127.0.0.1:6379/0 --threads 8
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from mock_redis import start_redis  # noqa: E402
+
+
+def build(backend, name, ttl):
+    from cache import RedisCache, SQLiteCache, TTLCache
+    from redis_client import get_redis_client
+
+    if backend == "memory":
+        return TTLCache(10000, ttl)
+    if backend == "sqlite":
+        return SQLiteCache(os.environ["SURFSCOUT_CACHE_DB"], table=name, ttl=ttl)
+    return RedisCache(get_redis_client(), name, ttl=ttl)
+
+
+def measure(backend, operations, threads):
+    """Mean microseconds per get and per set, spread over threads"""
+    cache = build(backend, "bench", 600)
+    cache.clear()
+    value = "Solid swell with light offshore winds makes for clean, rideable waves. " * 4
+    per_thread = operations // threads
+    timings = {}
+
+    for op in ("set", "get"):
+        def work(offset):
+            for i in range(per_thread):
+                key = ("beach", offset, i % 500)
+                if op == "set":
+                    cache.set(key, value)
+                else:
+                    cache.get(key)
+
+        workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        timings[op] = (time.perf_counter() - started) / (per_thread * threads) * 1e6
+    cache.clear()
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SurfScout's cache backends.")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite", "redis"],
+                        choices=["memory", "sqlite", "redis"])
+    parser.add_argument("--operations", type=int, default=5000, help="gets and sets per backend")
+    parser.add_argument("--threads", type=int, default=1, help="threads sharing each cache")
+    parser.add_argument("--redis-url", help="real Redis server to use instead of the local stand-in")
+    args = parser.parse_args(argv)
+
+    os.environ["SURFSCOUT_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="surfscout-bench-"), "cache.sqlite3")
+    if "redis" in args.backends:
+        if args.redis_url:
+            os.environ["SURFSCOUT_REDIS_URL"] = args.redis_url
+        else:
+            _, os.environ["SURFSCOUT_REDIS_URL"] = start_redis()
+        print(f"redis: {os.environ['SURFSCOUT_REDIS_URL']}{'' if args.redis_url else ' (stand-in)'}\n")
+
+    print(f"{'backend':<8} {'get us':>8} {'set us':>8}")
+    for backend in args.backends:
+        timings = measure(backend, args.operations, args.threads)
+        print(f"{backend:<8} {timings['get']:>8.1f} {timings['set']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+# Decode microbenchmark: parse time and retained memory of multi-day weather.json
+# payloads, decoded the old way (json.loads into dicts, walked with .get())
+# versus straight into the typed, slotted classes in schemas.py.
+#
+#     python benchmarks/bench_decode.py --days 1 3 7
+#     python benchmarks/bench_decode.py --no-msgspec    # measure the json fallback
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from mock_servers import weather_response  # noqa: E402
+
+COLUMNS = {"tides": ("height", "type"), "wind": ("speed", "direction"), "swell": ("height", "direction")}
+
+
+def walk_dicts(data):
+    """The fields the app reads, pulled out of json.loads output with .get() chains"""
+    rows = []
+    forecasts = data.get("forecasts") or {}
+    for forecast_type, columns in COLUMNS.items():
+        for day in (forecasts.get(forecast_type) or {}).get("days") or []:
+            for entry in day.get("entries") or []:
+                rows.append((entry.get("dateTime"),) + tuple(entry.get(column) for column in columns))
+    return rows
+
+
+def walk_typed(data):
+    """The same fields read as attributes of a schemas.WeatherResponse"""
+    rows = []
+    for forecast_type, columns in COLUMNS.items():
+        forecast = getattr(data.forecasts, forecast_type)
+        for day in (forecast.days or ()) if forecast else ():
+            for entry in day.entries or ():
+                rows.append((entry.dateTime,) + tuple(getattr(entry, column) for column in columns))
+    return rows
+
+
+def retained_bytes(decode, payload):
+    """Bytes still allocated while the decoded result is held"""
+    tracemalloc.start()
+    result = decode(payload)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def best_of(fn, number, repeat=5):
+    """Fastest time per call in microseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare weather payload decoding strategies.")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 3, 7], help="forecast days per payload")
+    parser.add_argument("--number", type=int, default=200, help="decodes per timing run")
+    parser.add_argument("--no-msgspec", action="store_true", help="use the json fallback even if msgspec is installed")
+    args = parser.parse_args(argv)
+
+    if args.no_msgspec:
+        # A None entry makes `import msgspec` raise ImportError
+        sys.modules["msgspec"] = None
+    import schemas
+
+    print(f"schemas backend: {'msgspec' if schemas.msgspec else 'json fallback'}\n")
+    print(f"{'days':>4} {'payload':>9} {'decoder':<8} {'decode us':>10} {'+ walk us':>10} {'retained':>10}")
+    for days in args.days:
+        payload = json.dumps(weather_response(4950, days=days)).encode()
+        decoders = {
+            "dicts": (json.loads, walk_dicts),
+            "typed": (schemas.decode_weather, walk_typed),
+        }
+        for name, (decode, walk) in decoders.items():
+            assert walk(decode(payload)) == walk_dicts(json.loads(payload))
+            decode_us = best_of(lambda: decode(payload), args.number)
+            total_us = best_of(lambda: walk(decode(payload)), args.number)
+            retained = retained_bytes(decode, payload)
+            print(f"{days:>4} {len(payload) / 1024:>7.1f}KB {name:<8} {decode_us:>10.1f} {total_us:>10.1f} "
+                  f"{retained / 1024:>8.1f}KB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# End-to-end benchmark: drives the real search -> conditions -> score ->
+# assessment code paths against local mock WillyWeather and OpenAI servers
+# (see mock_servers.py), then reports throughput and per-stage latency.
+#
+#     python benchmarks/bench_e2e.py --requests 500 --concurrency 20
+#     python benchmarks/bench_e2e.py --mode async --ww-latency 0.08 --error-rate 0.05
+#     python benchmarks/bench_e2e.py --cold     # clear every cache between journeys
+#     python benchmarks/bench_e2e.py --cache-backend redis    # shared caches on the Redis stand-in
+#
+# --mode sync calls the functions in app.py from a thread pool, the way
+# concurrent Streamlit sessions do; --mode async uses async_client.py.
+# The app's own rate limits are lifted unless --keep-rate-limits is given, so
+# the numbers show our overhead rather than the configured upstream quotas.
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from mock_redis import start_redis  # noqa: E402
+from mock_servers import MockConfig, start_openai, start_willyweather  # noqa: E402
+
+STAGES = ("search", "conditions", "score", "assess", "total")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SurfScout end to end against mock upstreams.")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync", help="app.py (threads) or async_client.py")
+    parser.add_argument("--requests", type=int, default=200, help="user journeys to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="journeys in flight at once")
+    parser.add_argument("--beaches", type=int, default=50, help="distinct beach names to pick from")
+    parser.add_argument("--cold", action="store_true", help="clear every cache before each journey")
+    parser.add_argument("--cache-backend", choices=("memory", "sqlite", "redis"),
+                        help="put every cache on this backend (redis uses the local stand-in in mock_redis.py)")
+    parser.add_argument("--ww-latency", type=float, default=0.05, help="mock WillyWeather latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock OpenAI latency in seconds")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.0,
+                        help="pause between streamed OpenAI chunks in seconds (--llm-latency is then time to first chunk)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency jitter as a fraction of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of upstream calls failing with 429")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the app's configured rate limits")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for beach selection")
+    return parser.parse_args(argv)
+
+
+def start_mocks(args):
+    """Start both mock upstreams and point the app's settings at them"""
+    ww_config = MockConfig(args.ww_latency, args.ww_latency * args.jitter, args.error_rate, args.rate_limit_rate)
+    llm_config = MockConfig(args.llm_latency, args.llm_latency * args.jitter, args.error_rate, args.rate_limit_rate,
+                            args.llm_chunk_delay)
+    _, ww_url = start_willyweather(ww_config)
+    _, llm_url = start_openai(llm_config)
+
+    # Must be set before the app modules are imported, since they read settings at import time
+    os.environ["WILLYWEATHER_BASE_URL"] = ww_url
+    os.environ["OPENAI_BASE_URL"] = llm_url
+    os.environ.setdefault("WILLYWEATHER_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["SURFSCOUT_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="surfscout-bench-"), "cache.sqlite3")
+    if args.cache_backend:
+        os.environ["SURFSCOUT_CACHE_BACKEND"] = args.cache_backend
+    if args.cache_backend == "redis":
+        _, os.environ["SURFSCOUT_REDIS_URL"] = start_redis()
+    if not args.keep_rate_limits:
+        for name, value in (("SURFSCOUT_WILLYWEATHER_RATE", "100000"), ("SURFSCOUT_WILLYWEATHER_BURST", "100000"),
+                            ("SURFSCOUT_OPENAI_RPM", "10000000"), ("SURFSCOUT_OPENAI_TPM", "1000000000")):
+            os.environ.setdefault(name, value)
+    return {"willyweather": ww_config, "openai": llm_config}
+
+
+def clear_caches():
+    from cache import assessment_cache, baseline_cache, forecast_cache, search_cache
+
+    search_cache.clear()
+    assessment_cache.clear()
+    baseline_cache.clear()
+    forecast_cache.clear()
+
+
+class Timer:
+    """Collects per-stage latencies and failures for every journey"""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.failures = {stage: 0 for stage in STAGES}
+
+    def add(self, stage, started):
+        self.samples[stage].append(time.perf_counter() - started)
+
+    def fail(self, stage):
+        self.failures[stage] += 1
+        self.failures["total"] += 1
+
+
+def journey_sync(app, query, timer, cold):
+    """One user looking up a beach through app.py; returns after the first failed stage"""
+    from scoring import score_conditions
+
+    if cold:
+        clear_caches()
+    started = time.perf_counter()
+
+    t = time.perf_counter()
+    locations = app.search_beach(query)
+    timer.add("search", t)
+    if not locations:
+        return timer.fail("search")
+
+    t = time.perf_counter()
+    conditions = app.get_surf_conditions(locations[0].id)
+    timer.add("conditions", t)
+    if conditions is None:
+        return timer.fail("conditions")
+
+    t = time.perf_counter()
+    score = score_conditions(conditions)
+    timer.add("score", t)
+
+    t = time.perf_counter()
+    assessment = app.assess_surf_quality(conditions, locations[0].name, score)
+    timer.add("assess", t)
+    if assessment["explanation"] == app.FAILED_EXPLANATION:
+        return timer.fail("assess")
+
+    timer.add("total", started)
+
+
+async def journey_async(async_client, query, timer, cold):
+    """One lookup through async_client.py; returns after the first failed stage"""
+    from openai import OpenAIError
+
+    from ratelimit import RateLimitExceeded
+    from scoring import score_conditions
+    from willyweather import WillyWeatherError
+
+    if cold:
+        clear_caches()
+    started = time.perf_counter()
+    stage = "search"
+    try:
+        t = time.perf_counter()
+        locations = await async_client.search_beach(query)
+        timer.add(stage, t)
+
+        stage = "conditions"
+        t = time.perf_counter()
+        conditions = await async_client.get_surf_conditions(locations[0].id)
+        timer.add(stage, t)
+
+        stage = "score"
+        t = time.perf_counter()
+        score = score_conditions(conditions)
+        timer.add(stage, t)
+
+        stage = "assess"
+        t = time.perf_counter()
+        await async_client.assess_surf_quality(conditions, locations[0].name, score)
+        timer.add(stage, t)
+    except (WillyWeatherError, OpenAIError, RateLimitExceeded, IndexError):
+        return timer.fail(stage)
+    timer.add("total", started)
+
+
+def run_sync(queries, concurrency, cold):
+    import app
+
+    # Outside `streamlit run` every st.error call warns about the missing script context
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit.runtime.scriptrunner"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    timer = Timer()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(journey_sync, app, query, timer, cold) for query in queries]:
+            future.result()
+    return timer
+
+
+def run_async(queries, concurrency, cold):
+    import async_client
+
+    timer = Timer()
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(query):
+            async with semaphore:
+                await journey_async(async_client, query, timer, cold)
+
+        try:
+            await asyncio.gather(*(bounded(query) for query in queries))
+        finally:
+            await async_client.aclose()
+
+    asyncio.run(main())
+    return timer
+
+
+def percentile(samples, q):
+    """q-th percentile (0-100) of samples, interpolated between the nearest ranks"""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def report(timer, elapsed, mocks):
+    completed = len(timer.samples["total"])
+    print(f"{completed} journeys completed in {elapsed:.2f}s ({completed / elapsed:.1f}/s), "
+          f"{timer.failures['total']} failed\n")
+    print(f"{'stage':<11} {'count':>6} {'failed':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in STAGES:
+        samples = [s * 1000 for s in timer.samples[stage]]
+        if not samples:
+            print(f"{stage:<11} {0:>6} {timer.failures[stage]:>6}")
+            continue
+        print(f"{stage:<11} {len(samples):>6} {timer.failures[stage]:>6} {statistics.fmean(samples):9.2f} "
+              f"{percentile(samples, 50):9.2f} {percentile(samples, 95):9.2f} {percentile(samples, 99):9.2f}")
+
+    from ratelimit import upstream_stats
+    from singleflight import inflight
+
+    print("\nUpstream requests served by the mocks:")
+    for name, config in mocks.items():
+        print(f"  {name:<13} {config.requests:>6} ({config.errors} injected failures)")
+    print(f"  coalesced     {inflight.stats()['shared']:>6} callers shared an in-flight call")
+    print(f"  limiters      {upstream_stats()}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mocks = start_mocks(args)
+
+    rng = random.Random(args.seed)
+    names = [f"Benchmark Beach {i}" for i in range(args.beaches)]
+    queries = [rng.choice(names) for _ in range(args.requests)]
+
+    run = run_sync if args.mode == "sync" else run_async
+    started = time.perf_counter()
+    timer = run(queries, max(1, args.concurrency), args.cold)
+    report(timer, time.perf_counter() - started, mocks)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
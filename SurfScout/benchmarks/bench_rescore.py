@@ -0,0 +1,107 @@
+import argparse
+import math
+import os
+import random
+import sys
+
+# Re-scoring benchmark: replays a day of forecast refreshes for many beaches and
+# counts the OpenAI calls each policy would make. "bucketed" is the assessment
+# cache on its own (a call whenever the bucketed conditions key is new or has
+# expired); "incremental" also keeps each beach's last explanation until tide,
+# wind, swell or the score move past the SURFSCOUT_RESCORE_* thresholds.
+#
+# Weather is modelled as a steady tide cycle plus a slowly drifting wind and
+# swell, with every refresh adding --noise worth of forecast revisions on top.
+# The clock is simulated, so a day replays in well under a second.
+#
+#     python benchmarks/bench_rescore.py
+#     python benchmarks/bench_rescore.py --noise 0.5 --drift 2    # unsettled weather
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+# Hours between high tides (semi-diurnal)
+TIDE_PERIOD = 12.42
+
+
+def weather(rng, hours, interval, noise, drift):
+    """Conditions at each refresh over the replay for one beach, as (hour, Conditions) pairs"""
+    from conditions import Conditions
+
+    tide_mid, tide_range = 1.0 + rng.random() * 0.2, 1.0 + rng.random() * 0.6
+    phase = rng.random() * TIDE_PERIOD
+    wind_speed, wind_direction = 5 + rng.random() * 20, rng.randrange(360)
+    swell_height, swell_direction = 0.5 + rng.random() * 2, rng.randrange(60, 200)
+
+    readings = []
+    steps = int(hours * 60 / interval)
+    for step in range(steps + 1):
+        hour = step * interval / 60
+        angle = 2 * math.pi * (hour + phase) / TIDE_PERIOD
+        # Drift is per hour; noise is the scatter between one forecast revision and the next
+        wind_speed = max(0.0, wind_speed + rng.gauss(0, drift) * interval / 60)
+        wind_direction += rng.gauss(0, drift * 4) * interval / 60
+        swell_height = max(0.2, swell_height + rng.gauss(0, drift * 0.05) * interval / 60)
+        readings.append((hour, Conditions(
+            tide_height=round(tide_mid + tide_range / 2 * math.cos(angle), 2),
+            # The nearest tide event is high for the half cycle around each peak
+            tide_type="high" if math.cos(angle) >= 0 else "low",
+            wind_speed=round(max(0.0, wind_speed + rng.gauss(0, noise * 3)), 1),
+            wind_direction=round(wind_direction + rng.gauss(0, noise * 10)) % 360,
+            swell_height=round(max(0.2, swell_height + rng.gauss(0, noise * 0.1)), 2),
+            swell_direction=round(swell_direction + rng.gauss(0, noise * 5)) % 360,
+        )))
+    return readings
+
+
+def replay(readings, beach_name, incremental):
+    """OpenAI calls one beach needs over its readings under one policy"""
+    from assessment import assessment_cache_key, material_changes
+    from cache import ASSESSMENT_CACHE_TTL, BASELINE_CACHE_TTL
+    from scoring import score_conditions
+
+    cached = {}  # bucketed key -> expiry hour
+    baseline = None  # (conditions, score, expiry hour)
+    calls = 0
+    for hour, conditions in readings:
+        score = score_conditions(conditions)
+        key = assessment_cache_key(conditions, beach_name)
+        if cached.get(key, -1) > hour:
+            continue
+        if incremental and baseline is not None and baseline[2] > hour \
+                and not material_changes(baseline[0], conditions, baseline[1], score):
+            continue
+        calls += 1
+        cached[key] = hour + ASSESSMENT_CACHE_TTL / 3600
+        baseline = (conditions, score, hour + BASELINE_CACHE_TTL / 3600)
+    return calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count OpenAI calls with and without incremental re-scoring.")
+    parser.add_argument("--beaches", type=int, default=50)
+    parser.add_argument("--hours", type=float, default=24, help="length of the replay")
+    parser.add_argument("--interval", type=float, default=15, help="minutes between forecast refreshes")
+    parser.add_argument("--noise", type=float, default=0.2, help="forecast revision scatter (1 = choppy)")
+    parser.add_argument("--drift", type=float, default=0.5, help="how fast the weather changes (1 = changeable)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    totals = {"bucketed": 0, "incremental": 0}
+    for beach in range(args.beaches):
+        readings = weather(rng, args.hours, args.interval, args.noise, args.drift)
+        for policy in totals:
+            totals[policy] += replay(readings, f"Beach {beach}", policy == "incremental")
+
+    refreshes = args.beaches * (int(args.hours * 60 / args.interval) + 1)
+    print(f"{args.beaches} beaches, {args.hours:g} h, a refresh every {args.interval:g} min ({refreshes} refreshes)")
+    print(f"{'policy':<12} {'calls':>7} {'per beach':>10}")
+    for policy, calls in totals.items():
+        print(f"{policy:<12} {calls:>7} {calls / args.beaches:>10.1f}")
+    print(f"\n{totals['bucketed'] / max(1, totals['incremental']):.1f}x fewer OpenAI calls")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
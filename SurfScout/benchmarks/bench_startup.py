@@ -0,0 +1,102 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start benchmark: how long a fresh interpreter takes to import app.py and
+# to render the first page. Each measurement runs in its own process so nothing
+# is served from an already-populated sys.modules.
+#
+#     python benchmarks/bench_startup.py --runs 10 --imports 15
+#     python benchmarks/bench_startup.py --max-import-ms 400   # fail if slower
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = """
+import time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+FIRST_RENDER = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("app.py", default_timeout=60).run()
+print(time.perf_counter() - start)
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    # Dummy keys so main() renders the normal page rather than the missing-key error
+    env.setdefault("WILLYWEATHER_API_KEY", "benchmark")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    return env
+
+
+def run_python(code, *flags):
+    """Run code in a fresh interpreter inside the app directory, returning (stdout, stderr)"""
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=APP_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return result.stdout, result.stderr
+
+
+def measure(code, runs):
+    """Seconds reported by code over several fresh processes"""
+    return [float(run_python(code)[0].strip().splitlines()[-1]) for _ in range(runs)]
+
+
+def slowest_imports(count):
+    """(cumulative microseconds, module) for the slowest top-level imports of app.py"""
+    _, stderr = run_python("import app", "-X", "importtime")
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two spaces per level; keep the modules app.py imports directly
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 1:
+            timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:count]
+
+
+def summarize(label, seconds):
+    ms = [s * 1000 for s in seconds]
+    print(f"{label:<16} median {statistics.median(ms):7.1f} ms   min {min(ms):7.1f} ms   max {max(ms):7.1f} ms")
+    return statistics.median(ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure SurfScout cold-start time.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--imports", type=int, default=10, help="show the N slowest imports (0 to skip)")
+    parser.add_argument("--max-import-ms", type=float, help="exit non-zero if the median import time is above this")
+    parser.add_argument("--max-render-ms", type=float, help="exit non-zero if the median first render is above this")
+    args = parser.parse_args(argv)
+
+    import_ms = summarize("import app", measure(IMPORT_APP, args.runs))
+    render_ms = summarize("first render", measure(FIRST_RENDER, args.runs))
+
+    if args.imports:
+        print("\nSlowest imports (cumulative):")
+        for microseconds, name in slowest_imports(args.imports):
+            print(f"  {microseconds / 1000:7.1f} ms  {name}")
+
+    failed = False
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"\nimport app took {import_ms:.1f} ms (budget {args.max_import_ms:.1f} ms)", file=sys.stderr)
+        failed = True
+    if args.max_render_ms is not None and render_ms > args.max_render_ms:
+        print(f"\nfirst render took {render_ms:.1f} ms (budget {args.max_render_ms:.1f} ms)", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import fnmatch
+import socketserver
+import threading
+import time
+
+# A small Redis-protocol stand-in covering the commands RedisCache uses (plus a
+# few for poking at it by hand), so the shared cache backend can be exercised
+# and benchmarked offline:
+#
+#     server, url = start_redis()    # then SURFSCOUT_REDIS_URL=url
+#
+# Expiry is lazy, like Redis: expired keys vanish the next time they're touched.
+
+
+class _Store:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+
+    def _alive(self, key, now):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= now:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def execute(self, name, args):
+        now = time.monotonic()
+        with self.lock:
+            self.commands += 1
+            if name == "PING":
+                return "+PONG"
+            if name in ("SELECT", "AUTH"):
+                return "+OK"
+            if name == "GET":
+                return self.data[args[0]] if self._alive(args[0], now) else None
+            if name == "SET":
+                key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+                self.data[key] = value
+                self.expires.pop(key, None)
+                if "PX" in options:
+                    self.expires[key] = now + int(args[2 + options.index("PX") + 1]) / 1000
+                elif "EX" in options:
+                    self.expires[key] = now + int(args[2 + options.index("EX") + 1])
+                return "+OK"
+            if name == "PTTL":
+                if not self._alive(args[0], now):
+                    return -2
+                expires_at = self.expires.get(args[0])
+                return -1 if expires_at is None else round((expires_at - now) * 1000)
+            if name == "DEL":
+                removed = 0
+                for key in args:
+                    if self._alive(key, now):
+                        del self.data[key]
+                        self.expires.pop(key, None)
+                        removed += 1
+                return removed
+            if name == "SCAN":
+                # Everything comes back in one batch, which the protocol allows
+                options = [a.decode().upper() for a in args[1:]]
+                pattern = args[1 + options.index("MATCH") + 1].decode() if "MATCH" in options else "*"
+                keys = [key for key in list(self.data)
+                        if self._alive(key, now) and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b"0", keys]
+            if name == "DBSIZE":
+                return sum(1 for key in list(self.data) if self._alive(key, now))
+            if name == "FLUSHDB":
+                self.data.clear()
+                self.expires.clear()
+                return "+OK"
+        return f"-ERR unknown command '{name}'"
+
+
+def _reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        # Strings are pre-formatted simple replies (+OK) or errors (-ERR ...)
+        return value.encode() + b"\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_reply(item) for item in value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, as typed into telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if not args:
+                return
+            name = args[0].decode().upper()
+            if name == "QUIT":
+                self.wfile.write(b"+OK\r\n")
+                return
+            self.wfile.write(_reply(self.server.store.execute(name, args[1:])))
+
+
+class MockRedis(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.store = _Store()
+
+
+def start_redis(host="127.0.0.1", port=0):
+    """Start the stand-in on a background thread, returning (server, redis_url)"""
+    server = MockRedis((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://{host}:{server.server_address[1]}/0"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a Redis-protocol stand-in for SurfScout's shared caches.")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = MockRedis(("127.0.0.1", args.port))
+    print(f"Serving redis://127.0.0.1:{args.port}/0 (Ctrl+C to stop)")
+    server.serve_forever()
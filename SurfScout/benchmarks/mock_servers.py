@@ -0,0 +1,239 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-ins for the WillyWeather and OpenAI endpoints the app calls, with
+# configurable latency and error injection, so benchmarks run fully offline.
+
+STATES = ["NSW", "QLD", "VIC", "SA", "WA", "TAS"]
+
+
+def _seed(*parts):
+    return int(hashlib.sha1("/".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+def location_for(location_id):
+    """Deterministic fake location for an id"""
+    rng = random.Random(_seed("location", location_id))
+    return {
+        "id": location_id,
+        "name": f"Beach {location_id}",
+        "region": f"Region {location_id % 17}",
+        "state": rng.choice(STATES),
+        "postcode": f"{2000 + location_id % 1000}",
+        "timeZone": "Australia/Sydney",
+        "lat": -33.0 - rng.random() * 10,
+        "lng": 150.0 + rng.random() * 5,
+        "typeId": 1,
+    }
+
+
+def search_response(query, limit=5):
+    """Search results for a query: the same query always finds the same locations"""
+    first = _seed("search", query.lower()) % 100000
+    return [location_for(first + i) for i in range(limit)]
+
+
+def _day_entries(day, hours, make_entry):
+    return [make_entry(day + timedelta(hours=h), h) for h in hours]
+
+
+def weather_response(location_id, forecast_types=("tides", "wind", "swell"), days=1, start=None):
+    """A WillyWeather-shaped weather.json payload covering days from start (default today)"""
+    rng = random.Random(_seed("weather", location_id))
+    start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    base_swell = 0.5 + rng.random() * 2.5
+    swell_direction = rng.randrange(60, 200)
+    forecasts = {}
+    for forecast_type in forecast_types:
+        forecast_days = []
+        for d in range(days):
+            day = start + timedelta(days=d)
+            if forecast_type == "tides":
+                entries = _day_entries(day, [3, 9, 15, 21], lambda t, h: {
+                    "dateTime": t.strftime("%Y-%m-%d %H:%M:%S"),
+                    "height": round(1.5 + rng.random() * 0.3 if h in (3, 15) else 0.3 + rng.random() * 0.3, 2),
+                    "type": "high" if h in (3, 15) else "low",
+                })
+            elif forecast_type == "wind":
+                entries = _day_entries(day, range(24), lambda t, h: {
+                    "dateTime": t.strftime("%Y-%m-%d %H:%M:%S"),
+                    "speed": round(5 + rng.random() * 30, 1),
+                    "gustSpeed": round(10 + rng.random() * 40, 1),
+                    "direction": rng.randrange(360),
+                    "directionText": "W",
+                })
+            elif forecast_type == "swell":
+                entries = _day_entries(day, range(0, 24, 3), lambda t, h: {
+                    "dateTime": t.strftime("%Y-%m-%d %H:%M:%S"),
+                    "height": round(base_swell + rng.uniform(-0.3, 0.3), 2),
+                    "period": round(8 + rng.random() * 6, 1),
+                    "direction": swell_direction + rng.randrange(-10, 10),
+                    "directionText": "SE",
+                })
+            else:
+                continue
+            forecast_days.append({"dateTime": day.strftime("%Y-%m-%d %H:%M:%S"), "entries": entries})
+        forecasts[forecast_type] = {
+            "days": forecast_days,
+            "units": {"height": "m", "speed": "km/h"},
+            "issueDateTime": start.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    return {"location": location_for(location_id), "forecasts": forecasts}
+
+
+class MockConfig:
+    """Latency and error injection for a mock server"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, chunk_delay=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        # Pause between streamed chunks; latency is then the time to the first one
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def fault(self):
+        """Status code to fail this request with, or None to serve it normally"""
+        with self._lock:
+            self.requests += 1
+            roll = random.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return 503
+            if roll < self.error_rate + self.rate_limit_rate:
+                self.errors += 1
+                return 429
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _fail(self, status):
+        headers = {"Retry-After": "1"} if status == 429 else {}
+        self._send(status, {"error": {"message": "injected failure", "code": status}}, headers=headers)
+
+
+class WillyWeatherHandler(_Handler):
+    def do_GET(self):
+        self.config.delay()
+        status = self.config.fault()
+        if status:
+            return self._fail(status)
+
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.endswith("/search.json"):
+            return self._send(200, search_response(params.get("query", ""), int(params.get("limit", 5))))
+        if url.path.endswith("/weather.json"):
+            location_id = int(url.path.split("/")[-2])
+            forecast_types = params.get("forecasts", "tides,wind,swell").split(",")
+            return self._send(200, weather_response(location_id, forecast_types, int(params.get("days", 1))))
+        self._send(404, {"error": "not found"})
+
+
+class OpenAIHandler(_Handler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.config.delay()
+        status = self.config.fault()
+        if status:
+            return self._fail(status)
+        if not self.path.endswith("/chat/completions"):
+            return self._send(404, {"error": "not found"})
+
+        content = json.dumps({"explanation": "Solid swell with light offshore winds makes for clean, rideable waves."})
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage")
+            return self._stream(content, include_usage=include_usage)
+        self._send(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 180, "completion_tokens": 60, "total_tokens": 240},
+        })
+
+    def _stream(self, content, chunk_size=8, include_usage=False):
+        """Server-sent events in the chat.completion.chunk format"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i in range(0, len(content), chunk_size):
+            if i:
+                time.sleep(self.config.chunk_delay)
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "gpt-4o",
+                "choices": [{"index": 0, "delta": {"content": content[i:i + chunk_size]}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        if include_usage:
+            # Like the real API, usage arrives in a final chunk with no choices
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "gpt-4o",
+                "choices": [],
+                "usage": {"prompt_tokens": 180, "completion_tokens": 60, "total_tokens": 240},
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def start_server(handler, config, host="127.0.0.1", port=0):
+    """Start a mock server on a background thread, returning (server, base_url)"""
+    handler_class = type(handler.__name__, (handler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def start_willyweather(config=None):
+    """Start a mock WillyWeather API; point WILLYWEATHER_BASE_URL at base_url + '/v2'"""
+    server, base_url = start_server(WillyWeatherHandler, config or MockConfig())
+    return server, base_url + "/v2"
+
+
+def start_openai(config=None):
+    """Start a mock OpenAI API; point OPENAI_BASE_URL at base_url + '/v1'"""
+    server, base_url = start_server(OpenAIHandler, config or MockConfig())
+    return server, base_url + "/v1"
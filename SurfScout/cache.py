@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import config  # noqa: F401  (loads .env)
+from redis_client import RedisError, get_redis_client
+from schemas import locations_from_builtins, to_builtins
+
+# Where the caches live. Unset keeps searches and assessments in process memory
+# and forecasts in SQLite; "memory", "sqlite" or "redis" puts every cache on that
+# backend ("redis" shares them between worker processes on any number of hosts)
+CACHE_BACKEND = os.getenv("SURFSCOUT_CACHE_BACKEND", "").lower()
+
+# Search cache settings (can be overridden in the .env file)
+SEARCH_CACHE_TTL = float(os.getenv("SURFSCOUT_SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SURFSCOUT_SEARCH_CACHE_MAX_ENTRIES", "1024"))
+
+ASSESSMENT_CACHE_TTL = float(os.getenv("SURFSCOUT_ASSESSMENT_CACHE_TTL", "3600"))
+ASSESSMENT_CACHE_MAX_ENTRIES = int(os.getenv("SURFSCOUT_ASSESSMENT_CACHE_MAX_ENTRIES", "4096"))
+# Longest a beach's last explanation is reused while its forecast barely moves
+BASELINE_CACHE_TTL = float(os.getenv("SURFSCOUT_BASELINE_CACHE_TTL", "21600"))
+
+# Only used when forecasts are cached in process memory
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("SURFSCOUT_FORECAST_CACHE_MAX_ENTRIES", "4096"))
+
+# Forecast cache lives on disk so every Streamlit worker process on the host shares it
+CACHE_DB_PATH = os.getenv("SURFSCOUT_CACHE_DB", os.path.join(tempfile.gettempdir(), "surfscout-cache.sqlite3"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Normalize a search query so 'Bondi  Beach!' and 'bondi beach' share a cache key"""
+    query = _PUNCTUATION.sub(" ", query.casefold())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def _key_text(key):
+    """String form of a cache key (tuples become compact JSON arrays) for backends outside the process"""
+    return key if isinstance(key, str) else json.dumps(key, separators=(",", ":"))
+
+
+def _identity(value):
+    return value
+
+
+class CacheBackend:
+    """Interface every cache backend implements
+
+    Keys are strings or tuples of strings and numbers. Backends outside the
+    process store values as JSON, passed through the cache's encode function
+    on the way in and decode on the way out.
+    """
+
+    ttl = None
+    # Whether calls can block on disk or network I/O (async callers run those in a thread)
+    blocking = True
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (default: the cache's own TTL)"""
+        raise NotImplementedError
+
+    def ttl_remaining(self, key):
+        """Seconds until key expires, or None if it isn't cached (doesn't count as a hit or miss)"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every entry and reset the hit/miss counters"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        raise NotImplementedError
+
+    def _ttl(self, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None:
+            raise ValueError("No TTL given and the cache has no default")
+        return ttl
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe in-process cache with per-entry TTL and LRU eviction
+
+    Values are kept as they are, without any encoding.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                # Expired entries are dropped lazily on lookup
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, evicting the least recently used entries if full"""
+        expires_at = time.monotonic() + self._ttl(ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def ttl_remaining(self, key):
+        """Seconds until key expires, or None if it isn't cached (doesn't count as a hit or miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def clear(self):
+        """Drop every entry and reset the hit/miss counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """Disk-backed cache with absolute expiry times, shared between processes on one host
+
+    The database runs in WAL mode so readers in one worker never block the
+    writer in another. Values must be JSON-serializable once encoded.
+    """
+
+    def __init__(self, path, table="cache", ttl=None, encode=None, decode=None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.encode = encode or _identity
+        self.decode = decode or _identity
+        self.hits = 0
+        self.misses = 0
+        # sqlite3 connections can't be shared between threads, so each thread gets its own
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            # Opportunistically clear out stale rows whenever a new connection opens
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        row = self._connect().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (_key_text(key), time.time())
+        ).fetchone()
+        self._count(row is not None)
+        return default if row is None else self.decode(json.loads(row[0]))
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (default: the cache's own TTL)"""
+        self._connect().execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (_key_text(key), json.dumps(self.encode(value)), time.time() + self._ttl(ttl)),
+        )
+
+    def ttl_remaining(self, key):
+        """Seconds until key expires, or None if it isn't cached (doesn't count as a hit or miss)"""
+        row = self._connect().execute(
+            f"SELECT expires_at FROM {self.table} WHERE key = ?", (_key_text(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        remaining = row[0] - time.time()
+        return remaining if remaining > 0 else None
+
+    def clear(self):
+        """Drop every entry and reset the hit/miss counters"""
+        self._connect().execute(f"DELETE FROM {self.table}")
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size (including expired entries still on disk)"""
+        size = self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+class RedisCache(CacheBackend):
+    """Cache in a Redis-protocol server, shared by every worker process on every host
+
+    Entries live under "surfscout:<namespace>:" and expire server-side. If
+    the server can't be reached the cache behaves as if empty (and counts the
+    error) rather than failing the request.
+    """
+
+    def __init__(self, client, namespace, ttl=None, encode=None, decode=None):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.encode = encode or _identity
+        self.decode = decode or _identity
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._prefix = f"surfscout:{namespace}:"
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _command(self, *args, default=None):
+        try:
+            return self.client.command(*args)
+        except (OSError, RedisError):
+            self._count("errors")
+            return default
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing, expired or unreachable"""
+        data = self._command("GET", self._prefix + _key_text(key))
+        self._count("misses" if data is None else "hits")
+        return default if data is None else self.decode(json.loads(data))
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (default: the cache's own TTL)"""
+        milliseconds = max(1, round(self._ttl(ttl) * 1000))
+        self._command("SET", self._prefix + _key_text(key), json.dumps(self.encode(value)), "PX", milliseconds)
+
+    def ttl_remaining(self, key):
+        """Seconds until key expires, or None if it isn't cached (doesn't count as a hit or miss)"""
+        milliseconds = self._command("PTTL", self._prefix + _key_text(key))
+        # -2 means no such key and -1 no expiry, which these caches never set
+        return milliseconds / 1000 if milliseconds is not None and milliseconds > 0 else None
+
+    def _keys(self):
+        """Every key in this cache's namespace (SCAN, so the server is never blocked for long)"""
+        cursor = b"0"
+        while True:
+            reply = self._command("SCAN", cursor, "MATCH", self._prefix + "*", "COUNT", 500)
+            if reply is None:
+                return
+            cursor, keys = reply
+            yield from keys
+            if cursor == b"0":
+                return
+
+    def clear(self):
+        """Drop every entry in this namespace and reset the hit/miss counters"""
+        keys = list(self._keys())
+        for i in range(0, len(keys), 500):
+            self._command("DEL", *keys[i:i + 500])
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss/error counters and the namespace's size"""
+        size = sum(1 for _ in self._keys())
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "size": size}
+
+
+async def run_blocking(caches, fn, *args):
+    """Call fn, in a worker thread if any of the caches it touches can block
+
+    Keeps a slow SQLite file or an unreachable Redis from stalling every
+    request on the event loop; in-process caches are called directly.
+    """
+    if any(cache.blocking for cache in caches):
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+def make_cache(name, ttl, max_entries, default_backend, encode=None, decode=None):
+    """Create a named cache on the SURFSCOUT_CACHE_BACKEND backend (default_backend if unset)
+
+    encode/decode convert values to and from JSON-ready data for the
+    backends that store them outside the process.
+    """
+    backend = CACHE_BACKEND or default_backend
+    if backend == "memory":
+        return TTLCache(max_entries, ttl)
+    if backend == "sqlite":
+        return SQLiteCache(CACHE_DB_PATH, table=name, ttl=ttl, encode=encode, decode=decode)
+    if backend == "redis":
+        return RedisCache(get_redis_client(), name, ttl=ttl, encode=encode, decode=decode)
+    raise ValueError(f"Unknown SURFSCOUT_CACHE_BACKEND '{backend}' (expected memory, sqlite or redis)")
+
+
+# Streamlit re-executes app.py on every rerun, so shared caches live in this
+# imported module where they survive reruns and are shared by all sessions
+search_cache = make_cache("searches", SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES, "memory",
+                          encode=to_builtins, decode=locations_from_builtins)
+assessment_cache = make_cache("assessments", ASSESSMENT_CACHE_TTL, ASSESSMENT_CACHE_MAX_ENTRIES, "memory")
+# The conditions, score and explanation of each beach's most recent LLM call
+baseline_cache = make_cache("baselines", BASELINE_CACHE_TTL, ASSESSMENT_CACHE_MAX_ENTRIES, "memory")
+# Forecast entries always carry their own TTL (see willyweather.forecast_expiry)
+forecast_cache = make_cache("forecasts", None, FORECAST_CACHE_MAX_ENTRIES, "sqlite")
@@ -0,0 +1,64 @@
+import dataclasses
+import math
+import struct
+
+# Heights and speeds as doubles, directions as whole degrees; the tide type follows as UTF-8
+_PACKED = struct.Struct("<dddhh")
+
+
+def _finite(value):
+    """value as a float, rejecting NaN and infinities (raises ValueError)"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Conditions:
+    """Surf conditions at one beach and time
+
+    A flat, immutable record: hashable (so it can key caches directly) and a
+    fraction of the size of the nested tide/wind/swell dicts it replaces.
+    to_dict/from_dict convert to and from that nested JSON shape, and
+    to_bytes/from_bytes give a compact lossless encoding.
+    """
+    tide_height: float
+    tide_type: str
+    wind_speed: float
+    wind_direction: int
+    swell_height: float
+    swell_direction: int
+
+    def to_dict(self):
+        """The nested {"tide": ..., "wind": ..., "swell": ...} JSON shape"""
+        return {
+            "tide": {"height": self.tide_height, "type": self.tide_type},
+            "wind": {"speed": self.wind_speed, "direction": self.wind_direction},
+            "swell": {"height": self.swell_height, "direction": self.swell_direction},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from the nested JSON shape (raises KeyError, TypeError, ValueError or OverflowError if malformed)"""
+        tide, wind, swell = data["tide"], data["wind"], data["swell"]
+        return cls(
+            _finite(tide["height"]),
+            str(tide.get("type") or "Unknown"),
+            _finite(wind["speed"]),
+            round(_finite(wind["direction"])),
+            _finite(swell["height"]),
+            round(_finite(swell["direction"])),
+        )
+
+    def to_bytes(self):
+        """Compact binary encoding (28 bytes plus the tide type)"""
+        return _PACKED.pack(self.tide_height, self.wind_speed, self.swell_height,
+                            self.wind_direction, self.swell_direction) + self.tide_type.encode()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode the output of to_bytes"""
+        tide_height, wind_speed, swell_height, wind_direction, swell_direction = _PACKED.unpack_from(data)
+        tide_type = bytes(data[_PACKED.size:]).decode()
+        return cls(tide_height, tide_type, wind_speed, wind_direction, swell_height, swell_direction)
@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# Importing this module loads the .env file. Every module that reads settings
+# from the environment imports it, so the file is read once, before any of them.
+load_dotenv()
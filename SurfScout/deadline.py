@@ -0,0 +1,88 @@
+import asyncio
+import os
+import queue
+import time
+
+import config  # noqa: F401  (loads .env)
+
+# Overall time a user request may take, and the most any one stage may use of it
+REQUEST_DEADLINE = float(os.getenv("SURFSCOUT_REQUEST_DEADLINE", "15"))
+STAGE_BUDGETS = {
+    "search": float(os.getenv("SURFSCOUT_SEARCH_BUDGET", "5")),
+    "conditions": float(os.getenv("SURFSCOUT_CONDITIONS_BUDGET", "6")),
+    "assess": float(os.getenv("SURFSCOUT_ASSESS_BUDGET", "10")),
+}
+
+# Coroutines still finishing after their caller stopped waiting; held so they aren't garbage collected
+_background_tasks = set()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage runs out of its time budget"""
+
+
+class Deadline:
+    """An overall request deadline that hands each stage a share of what's left"""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds=REQUEST_DEADLINE):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left before the whole request is out of time (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, stage):
+        """Seconds the stage may take: its own budget, capped by what's left overall"""
+        return min(STAGE_BUDGETS[stage], self.remaining())
+
+
+def stream_within(budget, start, *args, **kwargs):
+    """Start work with start(emit, *args, **kwargs) and yield each item it emits as it arrives
+
+    start returns a concurrent.futures.Future for work running elsewhere (e.g.
+    on the async_client loop), so no thread is held while it runs. Stops with
+    DeadlineExceeded if the work hasn't finished within budget seconds (None
+    waits as long as it takes); the work itself runs on to completion. Errors
+    raised by the work are re-raised here.
+    """
+    expires_at = None if budget is None else time.monotonic() + budget
+    items = queue.Queue()
+    finished = object()
+
+    future = start(items.put, *args, **kwargs)
+    # Everything the work emitted is queued before it finishes, so this comes last
+    future.add_done_callback(lambda _: items.put(finished))
+    while True:
+        timeout = None if expires_at is None else max(0.0, expires_at - time.monotonic())
+        try:
+            item = items.get(timeout=timeout)
+        except queue.Empty:
+            raise DeadlineExceeded(f"Still waiting after {budget:.1f}s; finishing in the background")
+        if item is finished:
+            future.result()
+            return
+        yield item
+
+
+def _forget(task):
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        # Mark any exception as retrieved; nobody is left to report it to
+        task.exception()
+
+
+async def wait_within(budget, coroutine):
+    """Await coroutine for at most budget seconds (None waits as long as it takes)
+
+    If the budget runs out, DeadlineExceeded is raised but the coroutine keeps
+    running, so whatever it caches is there for the next caller.
+    """
+    task = asyncio.ensure_future(coroutine)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), budget)
+    except TimeoutError:
+        _background_tasks.add(task)
+        task.add_done_callback(_forget)
+        raise DeadlineExceeded(f"Still waiting after {budget:.1f}s; finishing in the background")
@@ -0,0 +1,190 @@
+import time
+
+import numpy as np
+
+from conditions import Conditions
+from scoring import score_arrays
+from schemas import Location
+from willyweather import entry_timestamp, location_timezone
+
+# Columns kept for each forecast type; every other field in an entry is dropped
+FORECAST_COLUMNS = {
+    "tides": ("height",),
+    "wind": ("speed", "direction"),
+    "swell": ("height", "direction"),
+}
+
+DIRECTION_COLUMNS = ("direction",)
+
+
+class ForecastSeries:
+    """One forecast type as compact columnar arrays sorted by time
+
+    timestamps are epoch seconds; every other column is float32. Tides also
+    carry the high/low type of each tide event in `types`.
+    """
+
+    __slots__ = ("timestamps", "columns", "types")
+
+    def __init__(self, timestamps, columns, types=None):
+        self.timestamps = timestamps
+        self.columns = columns
+        self.types = types
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def values_at(self, column, times):
+        """Interpolate a column at the given epoch times (clamped to the forecast range)"""
+        times = np.asarray(times, dtype=float)
+        values = self.columns[column]
+        if not len(self):
+            return np.zeros_like(times)
+        if column in DIRECTION_COLUMNS:
+            # Interpolate directions on the unit circle so 350° -> 10° passes through 0°
+            radians = np.radians(values)
+            x = np.interp(times, self.timestamps, np.cos(radians))
+            y = np.interp(times, self.timestamps, np.sin(radians))
+            return np.degrees(np.arctan2(y, x)) % 360
+        return np.interp(times, self.timestamps, values)
+
+    def tide_heights_at(self, times):
+        """Tide heights at the given times, following a cosine curve between high and low events"""
+        times = np.asarray(times, dtype=float)
+        heights = self.columns["height"]
+        if len(self) < 2:
+            return self.values_at("height", times)
+        upper = np.clip(np.searchsorted(self.timestamps, times, side="right"), 1, len(self) - 1)
+        lower = upper - 1
+        start, end = self.timestamps[lower], self.timestamps[upper]
+        fraction = np.clip((times - start) / (end - start), 0.0, 1.0)
+        return heights[lower] + (heights[upper] - heights[lower]) * (1 - np.cos(np.pi * fraction)) / 2
+
+    def types_at(self, times):
+        """High/low type of the tide event nearest each time"""
+        times = np.asarray(times, dtype=float)
+        if not len(self) or self.types is None:
+            return np.full(times.shape, "Unknown")
+        upper = np.clip(np.searchsorted(self.timestamps, times), 0, len(self) - 1)
+        lower = np.clip(upper - 1, 0, len(self) - 1)
+        nearer_lower = np.abs(times - self.timestamps[lower]) <= np.abs(self.timestamps[upper] - times)
+        return self.types[np.where(nearer_lower, lower, upper)]
+
+
+class SurfForecast:
+    """Tide, wind and swell forecasts for one location"""
+
+    __slots__ = ("location", "tides", "wind", "swell")
+
+    def __init__(self, location, tides, wind, swell):
+        self.location = location
+        self.tides = tides
+        self.wind = wind
+        self.swell = swell
+
+    @property
+    def start(self):
+        """Earliest forecast time across all types (epoch seconds)"""
+        starts = [s.timestamps[0] for s in (self.tides, self.wind, self.swell) if len(s)]
+        return float(min(starts)) if starts else None
+
+    @property
+    def end(self):
+        """Latest forecast time across all types (epoch seconds)"""
+        ends = [s.timestamps[-1] for s in (self.tides, self.wind, self.swell) if len(s)]
+        return float(max(ends)) if ends else None
+
+    def covers(self, times):
+        """Mask of the times inside every forecast type's readings (elsewhere values are extrapolated)
+
+        A forecast type with no readings at all covers nothing, so neither
+        does the forecast.
+        """
+        times = np.asarray(times, dtype=float)
+        mask = np.ones(times.shape, dtype=bool)
+        for series in (self.tides, self.wind, self.swell):
+            if not len(series):
+                return np.zeros(times.shape, dtype=bool)
+            mask &= (times >= series.timestamps[0]) & (times <= series.timestamps[-1])
+        return mask
+
+    def sample(self, times):
+        """Condition columns interpolated at the given times, ready for scoring.score_arrays"""
+        return {
+            "swell_height": self.swell.values_at("height", times),
+            "swell_direction": self.swell.values_at("direction", times),
+            "wind_speed": self.wind.values_at("speed", times),
+            "wind_direction": self.wind.values_at("direction", times),
+            "tide_height": self.tides.tide_heights_at(times),
+            "tide_type": self.tides.types_at(times),
+        }
+
+    def scores(self, times):
+        """Surf scores at each of the given times"""
+        return score_arrays(**self.sample(times))
+
+    def timeline(self, start=None, end=None, step=3600):
+        """Evenly spaced times covering [start, end) (defaults to the whole forecast)"""
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        if start is None or end is None:
+            return np.array([], dtype=float)
+        return np.arange(start, end, step, dtype=float)
+
+    def best_time(self, start=None, end=None, step=3600):
+        """(time, score) of the best surf between start and end, or None if the forecast is empty"""
+        times = self.timeline(start, end, step)
+        if not len(times):
+            return None
+        scores = self.scores(times)
+        best = int(np.argmax(scores))
+        return float(times[best]), float(scores[best])
+
+    def conditions_at(self, when=None):
+        """Conditions at an epoch time, defaulting to now"""
+        when = time.time() if when is None else when
+        sample = self.sample([when])
+        return Conditions(
+            tide_height=round(float(sample["tide_height"][0]), 2),
+            tide_type=str(sample["tide_type"][0]),
+            wind_speed=round(float(sample["wind_speed"][0]), 1),
+            wind_direction=round(float(sample["wind_direction"][0])),
+            swell_height=round(float(sample["swell_height"][0]), 2),
+            swell_direction=round(float(sample["swell_direction"][0])),
+        )
+
+
+def _parse_series(forecast, columns, tz, with_types=False):
+    """Flatten every entry of every day of one forecast type into a ForecastSeries"""
+    rows = []
+    for day in (forecast.days or ()) if forecast else ():
+        for entry in day.entries or ():
+            timestamp = entry_timestamp(entry, tz)
+            if timestamp is not None:
+                rows.append((timestamp, entry))
+    rows.sort(key=lambda row: row[0])
+
+    timestamps = np.array([timestamp for timestamp, _ in rows], dtype=np.int64)
+    values = {
+        # Missing readings default to 0, matching what the app has always shown
+        column: np.array([getattr(entry, column) or 0 for _, entry in rows], dtype=np.float32)
+        for column in columns
+    }
+    types = None
+    if with_types:
+        types = np.array([entry.type or "Unknown" for _, entry in rows], dtype=str)
+    return ForecastSeries(timestamps, values, types)
+
+
+def parse_forecast(data):
+    """Turn a schemas.WeatherResponse into a SurfForecast"""
+    location = data.location or Location()
+    tz = location_timezone(location.timeZone)
+    forecasts = data.forecasts
+    return SurfForecast(
+        location,
+        _parse_series(forecasts.tides, FORECAST_COLUMNS["tides"], tz, with_types=True),
+        _parse_series(forecasts.wind, FORECAST_COLUMNS["wind"], tz),
+        _parse_series(forecasts.swell, FORECAST_COLUMNS["swell"], tz),
+    )
+
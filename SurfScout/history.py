@@ -0,0 +1,270 @@
+import atexit
+import importlib.util
+import os
+import threading
+import time
+import uuid
+import warnings
+from datetime import datetime, timezone
+
+import config  # noqa: F401  (loads .env)
+import willyweather
+
+# Append-only Parquet history of every fetched forecast and every LLM
+# assessment, for analytics over months of data without refetching anything.
+# Each dataset is a directory of Hive-partitioned files:
+#
+#     <SURFSCOUT_HISTORY_DIR>/forecasts/date=2026-10-16/state=NSW/part-....parquet
+#     <SURFSCOUT_HISTORY_DIR>/assessments/date=2026-10-16/state=NSW/part-....parquet
+#
+# Requests only append plain tuples to an in-memory buffer; a background
+# thread turns them into rows and writes them in batches, so pyarrow (slow to
+# import) never runs on the request path. Files are written under a hidden
+# name and renamed into place, so readers never see a partial file.
+
+# Where history is written (unset turns it off)
+HISTORY_DIR = os.getenv("SURFSCOUT_HISTORY_DIR", "")
+# Records buffered before the writer wakes early, and the longest it waits otherwise
+HISTORY_BATCH_SIZE = int(os.getenv("SURFSCOUT_HISTORY_BATCH_SIZE", "500"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("SURFSCOUT_HISTORY_FLUSH_INTERVAL", "30"))
+# Records held in memory at most; beyond this the oldest are dropped (and counted)
+HISTORY_MAX_BUFFERED = int(os.getenv("SURFSCOUT_HISTORY_MAX_BUFFERED", "50000"))
+
+# Partition value for records whose state isn't known
+UNKNOWN_STATE = "unknown"
+
+# Columns for each forecast type's entries, on top of the shared ones
+_FORECAST_COLUMNS = {"tides": ("height", "type"), "wind": ("speed", "direction"), "swell": ("height", "direction")}
+
+
+def _schemas():
+    import pyarrow as pa
+
+    timestamp = pa.timestamp("ms", tz="UTC")
+    return {
+        "forecasts": pa.schema([
+            ("fetched_at", timestamp),
+            ("location_id", pa.int64()),
+            ("location_name", pa.string()),
+            ("forecast_type", pa.string()),
+            ("entry_time", timestamp),
+            ("height", pa.float64()),
+            ("speed", pa.float64()),
+            ("direction", pa.float64()),
+            ("type", pa.string()),
+        ]),
+        "assessments": pa.schema([
+            ("assessed_at", timestamp),
+            ("location_id", pa.int64()),
+            ("beach_name", pa.string()),
+            ("model", pa.string()),
+            ("score", pa.float64()),
+            ("explanation", pa.string()),
+            ("tide_height", pa.float64()),
+            ("tide_type", pa.string()),
+            ("wind_speed", pa.float64()),
+            ("wind_direction", pa.int64()),
+            ("swell_height", pa.float64()),
+            ("swell_direction", pa.int64()),
+        ]),
+    }
+
+
+def _utc(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+
+def forecast_rows(fetched_at, location_id, weather, forecast_types):
+    """One row per forecast entry of a WeatherResponse, with the partition it belongs in"""
+    location = weather.location
+    state = (location.state if location else None) or UNKNOWN_STATE
+    tz = willyweather.location_timezone(location.timeZone if location else None)
+    partition = (_utc(fetched_at).date().isoformat(), state)
+    for forecast_type in forecast_types:
+        forecast = getattr(weather.forecasts, forecast_type, None)
+        for day in (forecast.days or ()) if forecast else ():
+            for entry in day.entries or ():
+                timestamp = willyweather.entry_timestamp(entry, tz)
+                row = {
+                    "fetched_at": _utc(fetched_at),
+                    "location_id": location_id,
+                    "location_name": location.name if location else None,
+                    "forecast_type": forecast_type,
+                    "entry_time": _utc(timestamp) if timestamp is not None else None,
+                }
+                for column in _FORECAST_COLUMNS[forecast_type]:
+                    row[column] = getattr(entry, column)
+                yield partition, row
+
+
+def assessment_row(assessed_at, conditions, beach_name, score, explanation, model, location):
+    """The row for one assessment, with the partition it belongs in"""
+    state = getattr(location, "state", None) or UNKNOWN_STATE
+    row = {
+        "assessed_at": _utc(assessed_at),
+        "location_id": getattr(location, "id", None),
+        "beach_name": beach_name,
+        "model": model,
+        "score": float(score),
+        "explanation": explanation,
+        "tide_height": conditions.tide_height,
+        "tide_type": conditions.tide_type,
+        "wind_speed": conditions.wind_speed,
+        "wind_direction": conditions.wind_direction,
+        "swell_height": conditions.swell_height,
+        "swell_direction": conditions.swell_direction,
+    }
+    return (_utc(assessed_at).date().isoformat(), state), row
+
+
+class HistoryWriter:
+    """Buffers history records and writes them to Parquet in batches from a background thread"""
+
+    def __init__(self, root, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 max_buffered=HISTORY_MAX_BUFFERED):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.files_written = 0
+        self.rows_written = 0
+        self.dropped = 0
+        self.errors = 0
+        # (dataset, record) pairs; records are expanded into rows on the writer thread
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def append(self, dataset, record):
+        """Queue a record for writing (cheap: no I/O or pyarrow on the caller's thread)"""
+        with self._lock:
+            self._buffer.append((dataset, record))
+            if len(self._buffer) > self.max_buffered:
+                del self._buffer[0]
+                self.dropped += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def start(self):
+        """Start the writer thread (does nothing if it's already running)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="surfscout-history", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the writer thread, writing out anything still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every buffered record now, one file per dataset and partition"""
+        with self._flush_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+            if not records:
+                return
+            try:
+                self._write(records)
+            except Exception:
+                # Never let a bad batch kill the writer; the records are lost but counted
+                with self._lock:
+                    self.errors += 1
+                    self.dropped += len(records)
+
+    def _write(self, records):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        partitions = {}
+        for dataset, record in records:
+            rows = forecast_rows(*record) if dataset == "forecasts" else [assessment_row(*record)]
+            for partition, row in rows:
+                partitions.setdefault((dataset, partition), []).append(row)
+
+        schemas = _schemas()
+        batch_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        for (dataset, (date, state)), rows in partitions.items():
+            directory = os.path.join(self.root, dataset, f"date={date}", f"state={state}")
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{batch_id}.parquet"
+            # Hidden while being written; dataset readers skip names starting with "."
+            partial = os.path.join(directory, f".{name}.tmp")
+            pq.write_table(pa.Table.from_pylist(rows, schema=schemas[dataset]), partial, compression="zstd")
+            os.replace(partial, os.path.join(directory, name))
+            with self._lock:
+                self.files_written += 1
+                self.rows_written += len(rows)
+
+    def stats(self):
+        """Counters for what the writer has done"""
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "files_written": self.files_written,
+                "rows_written": self.rows_written,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+
+# One writer per process; its queue batches rows from every session into each flush
+writer = HistoryWriter(HISTORY_DIR) if HISTORY_DIR else None
+_started = False
+
+
+def record_forecast(location_id, weather, forecast_types=willyweather.SURF_FORECAST_TYPES):
+    """Append the forecast types just fetched for a location"""
+    if writer is not None:
+        writer.append("forecasts", (time.time(), location_id, weather, tuple(forecast_types)))
+
+
+def record_assessment(conditions, beach_name, score, explanation, model, location=None):
+    """Append a freshly written explanation (location, if known, supplies the id and state)"""
+    if writer is not None:
+        writer.append("assessments", (time.time(), conditions, beach_name, score, explanation, model, location))
+
+
+def start():
+    """Start the background writer if history is on (safe to call on every rerun)"""
+    global writer, _started
+    if writer is None or _started:
+        return
+    if importlib.util.find_spec("pyarrow") is None:
+        warnings.warn("SURFSCOUT_HISTORY_DIR is set but pyarrow isn't installed (pip install pyarrow); "
+                      "history is off")
+        writer = None
+        return
+    _started = True
+    writer.start()
+    # Streamlit never shuts down cleanly through our code, so flush what's left on exit
+    atexit.register(writer.stop)
+
+
+def stop():
+    if writer is not None:
+        writer.stop()
+
+
+def dataset(name):
+    """A pyarrow dataset over the history written so far ("forecasts" or "assessments")
+
+    e.g. dataset("forecasts").to_table(filter=pc.field("state") == "NSW")
+    """
+    import pyarrow.dataset as ds
+
+    return ds.dataset(os.path.join(HISTORY_DIR, name), format="parquet", partitioning="hive")
@@ -0,0 +1,13 @@
+import os
+
+import config  # noqa: F401  (loads .env)
+
+# HTTP client settings (can be overridden in the .env file)
+HTTP_POOL_SIZE = int(os.getenv("SURFSCOUT_HTTP_POOL_SIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("SURFSCOUT_HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("SURFSCOUT_HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("SURFSCOUT_HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("SURFSCOUT_HTTP_BACKOFF_FACTOR", "0.3"))
+HTTP_BACKOFF_JITTER = float(os.getenv("SURFSCOUT_HTTP_BACKOFF_JITTER", "0.3"))
+
+RETRY_STATUS_CODES = (500, 502, 503, 504)
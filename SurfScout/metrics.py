@@ -0,0 +1,174 @@
+import contextvars
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Latency histograms for each app stage and each upstream call, exportable in
+# the Prometheus text format, plus a per-run trace of spans for the debug panel.
+# Like the caches, these live outside app.py so they accumulate across reruns
+# and sessions; each server worker process keeps its own.
+
+# Upper bounds in seconds, from cache hits up to slow LLM completions
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Thread-safe Prometheus-style histogram with one series per label combination"""
+
+    def __init__(self, name, description, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (non-cumulative, last is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        """Record one observation for the given label values"""
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """Lines of Prometheus text exposition for this histogram"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labels, (counts, total, count) in series:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            suffix = f"{{{label_text}}}" if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_seconds = Histogram(
+    "surfscout_stage_seconds", "Time spent in each SurfScout stage.", ("stage",))
+upstream_seconds = Histogram(
+    "surfscout_upstream_request_seconds", "Latency of each upstream API call.", ("upstream", "endpoint", "status"))
+
+# Spans recorded during the current Streamlit run (or request), and how deeply nested we are
+_trace = contextvars.ContextVar("surfscout_trace", default=None)
+_depth = contextvars.ContextVar("surfscout_span_depth", default=0)
+
+
+def start_trace():
+    """Start collecting spans for the current run, returning the (live) list they go into"""
+    trace = []
+    _trace.set(trace)
+    _depth.set(0)
+    return trace
+
+
+@contextmanager
+def separate_trace(name):
+    """Time a block as the span name in a trace of its own, yielding that trace
+
+    Used for Streamlit fragments, which can rerun without the rest of the
+    script; the enclosing trace (if any) picks up again after the block.
+    """
+    trace = []
+    trace_token, depth_token = _trace.set(trace), _depth.set(0)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _trace.reset(trace_token)
+        _depth.reset(depth_token)
+
+
+@contextmanager
+def _traced(name):
+    """Add a span to the current trace (if any) for the duration of the block"""
+    trace = _trace.get()
+    entry = {"name": name, "depth": _depth.get(), "started": time.perf_counter(), "seconds": None}
+    if trace is not None:
+        trace.append(entry)
+    token = _depth.set(entry["depth"] + 1)
+    try:
+        yield entry
+    finally:
+        entry["seconds"] = time.perf_counter() - entry["started"]
+        _depth.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """Time a block as an app stage"""
+    with _traced(stage) as entry:
+        try:
+            yield
+        finally:
+            stage_seconds.observe(time.perf_counter() - entry["started"], stage)
+
+
+@contextmanager
+def upstream_call(upstream, endpoint):
+    """Time one upstream call; set call["status"] to the response status inside the block
+
+    If the block raises, the status comes from the exception's status_code
+    (as on OpenAI API errors) or is recorded as 'error'.
+    """
+    call = {"status": "error"}
+    with _traced(f"{upstream} {endpoint}") as entry:
+        try:
+            yield call
+        except BaseException as e:
+            call["status"] = getattr(e, "status_code", None) or "error"
+            raise
+        finally:
+            upstream_seconds.observe(time.perf_counter() - entry["started"], upstream, endpoint, str(call["status"]))
+
+
+def timed(stage):
+    """Decorator timing every call of a sync or async function as a stage"""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def carry_trace(coroutine):
+    """Wrap a coroutine so it records into the caller's trace when run on another thread's loop"""
+    trace, depth = _trace.get(), _depth.get()
+
+    async def run():
+        _trace.set(trace)
+        _depth.set(depth)
+        return await coroutine
+
+    return run()
+
+
+def render_prometheus():
+    """Every histogram in the Prometheus text exposition format"""
+    lines = stage_seconds.render() + upstream_seconds.render()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+
+import config  # noqa: F401  (loads .env)
+import willyweather
+from assessment import explanation_ttl_remaining
+from cache import assessment_cache, baseline_cache, forecast_cache, run_blocking
+from ratelimit import (
+    OPENAI_TOKENS_PER_CALL,
+    PROCESS_OPENAI_RPM,
+    PROCESS_OPENAI_TPM,
+    PROCESS_WILLYWEATHER_BURST,
+    PROCESS_WILLYWEATHER_RATE,
+    RateLimitExceeded,
+    TokenBucket,
+)
+
+# Share of each upstream rate limit the prefetcher may use (0 turns it off)
+PREFETCH_QUOTA_SHARE = float(os.getenv("SURFSCOUT_PREFETCH_QUOTA_SHARE", "0.2"))
+# Longest the scheduler sleeps between passes over the hot set
+PREFETCH_INTERVAL = float(os.getenv("SURFSCOUT_PREFETCH_INTERVAL", "60"))
+# Cached explanations expiring within this many seconds are refreshed early
+PREFETCH_LEAD = float(os.getenv("SURFSCOUT_PREFETCH_LEAD", "300"))
+# Most popular locations kept warm, and how popular one must be to count
+PREFETCH_HOT_SET = int(os.getenv("SURFSCOUT_PREFETCH_HOT_SET", "20"))
+PREFETCH_MIN_LOOKUPS = float(os.getenv("SURFSCOUT_PREFETCH_MIN_LOOKUPS", "3"))
+# Lookups count half as much after this many seconds
+PREFETCH_HALF_LIFE = float(os.getenv("SURFSCOUT_PREFETCH_HALF_LIFE", "3600"))
+
+# Locations tracked at once; the least popular are forgotten first
+_MAX_TRACKED = 1000
+
+
+class LookupTracker:
+    """Thread-safe, exponentially decaying lookup counts per location"""
+
+    def __init__(self, half_life=PREFETCH_HALF_LIFE, max_tracked=_MAX_TRACKED):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        # location_id -> [score, last updated, beach name]
+        self._locations = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score, updated, now):
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, location_id, beach_name=None):
+        """Count one lookup, remembering the beach name it was asked about under"""
+        now = time.time()
+        with self._lock:
+            entry = self._locations.get(location_id)
+            if entry is None:
+                if len(self._locations) >= self.max_tracked:
+                    coldest = min(self._locations, key=lambda i: self._decayed(*self._locations[i][:2], now))
+                    del self._locations[coldest]
+                entry = self._locations[location_id] = [0.0, now, None]
+            entry[0] = self._decayed(entry[0], entry[1], now) + 1
+            entry[1] = now
+            # The assessment cache is keyed on the beach name, so prefetch under the one users search for
+            entry[2] = beach_name or entry[2]
+
+    def hot(self, limit=PREFETCH_HOT_SET, min_score=PREFETCH_MIN_LOOKUPS):
+        """Up to limit (location_id, beach_name, score) tuples, most popular first"""
+        now = time.time()
+        with self._lock:
+            scored = [(location_id, name, self._decayed(score, updated, now))
+                      for location_id, (score, updated, name) in self._locations.items()]
+        # The slack lets lookups made moments ago count in full despite a sliver of decay
+        scored = [entry for entry in scored if entry[2] >= min_score - 0.01]
+        scored.sort(key=lambda entry: entry[2], reverse=True)
+        return scored[:limit]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._locations)
+
+
+def _quota_bucket(name, rate, capacity, minimum=1.0):
+    # max_wait=0 makes acquire fail immediately rather than queue: prefetching is never urgent
+    return TokenBucket(name, rate * PREFETCH_QUOTA_SHARE, max(minimum, capacity * PREFETCH_QUOTA_SHARE), max_wait=0)
+
+
+class PrefetchScheduler:
+    """Background thread keeping forecasts and explanations for the hot set cached
+
+    Forecasts are refetched as soon as they expire (the scheduler wakes at the
+    earliest expiry in the hot set), and explanations are requested for each
+    location's current conditions before their cache entry runs out. Upstream
+    calls draw on dedicated token buckets holding PREFETCH_QUOTA_SHARE of each
+    rate limit, on top of the shared limiters, so user requests keep the rest.
+    """
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.forecasts_refreshed = 0
+        self.assessments_refreshed = 0
+        self.skipped_for_quota = 0
+        self.errors = 0
+        self._willyweather_quota = _quota_bucket(
+            "Prefetch WillyWeather", PROCESS_WILLYWEATHER_RATE, PROCESS_WILLYWEATHER_BURST)
+        self._openai_request_quota = _quota_bucket(
+            "Prefetch OpenAI requests", PROCESS_OPENAI_RPM / 60, PROCESS_OPENAI_RPM / 60)
+        self._openai_token_quota = _quota_bucket(
+            "Prefetch OpenAI tokens", PROCESS_OPENAI_TPM / 60, PROCESS_OPENAI_TPM / 60, minimum=OPENAI_TOKENS_PER_CALL)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the scheduler thread (does nothing if it's already running)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="surfscout-prefetch", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Ask the scheduler thread to finish and wait for it"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        import async_client
+
+        # Sleep first so starting the scheduler never competes with the first page render
+        while not self._stop.wait(self._next_wake()):
+            try:
+                async_client.run(self.refresh_hot_set())
+            except Exception:
+                # Never let one bad pass kill the thread; the next pass retries
+                self.errors += 1
+
+    def _next_wake(self):
+        """Seconds until the earliest forecast in the hot set expires, capped at PREFETCH_INTERVAL"""
+        remaining = [willyweather.forecast_ttl_remaining(location_id) for location_id, _, _ in self.tracker.hot()]
+        remaining = [seconds for seconds in remaining if seconds is not None]
+        # A second's slack so the entry has really expired when we look again
+        return max(1.0, min(remaining + [PREFETCH_INTERVAL]) + 1.0)
+
+    def _take(self, *buckets_and_tokens):
+        """Take quota from each (bucket, tokens) pair, or none of it if any is exhausted"""
+        taken = []
+        try:
+            for bucket, tokens in buckets_and_tokens:
+                bucket.acquire(tokens)
+                taken.append((bucket, tokens))
+        except RateLimitExceeded:
+            for bucket, tokens in taken:
+                bucket.settle(tokens, 0)
+            self.skipped_for_quota += 1
+            return False
+        return True
+
+    async def refresh_hot_set(self):
+        """One pass over the hot set, stopping early once the prefetch quota runs out"""
+        from openai import OpenAIError
+
+        import async_client
+
+        for location_id, beach_name, _ in self.tracker.hot():
+            try:
+                if not await self._refresh(async_client, location_id, beach_name):
+                    return
+            except (willyweather.WillyWeatherError, OpenAIError, RateLimitExceeded):
+                self.errors += 1
+
+    async def _refresh(self, async_client, location_id, beach_name):
+        """Warm one location's forecast and explanation; False if we ran out of quota"""
+        from scoring import score_conditions
+
+        # Cache lookups go through run_blocking so a slow backend doesn't hold up the shared loop
+        if await run_blocking((forecast_cache,), willyweather.forecast_ttl_remaining, location_id) is None:
+            if not self._take((self._willyweather_quota, 1)):
+                return False
+            forecast = await async_client.get_forecast(location_id, refresh=True)
+            self.forecasts_refreshed += 1
+        else:
+            forecast = await async_client.get_forecast(location_id)
+
+        if not beach_name or not os.getenv("OPENAI_API_KEY"):
+            return True
+        conditions = forecast.conditions_at()
+        # A refreshed forecast that hasn't materially changed keeps the explanation it already has
+        remaining = await run_blocking((assessment_cache, baseline_cache), explanation_ttl_remaining,
+                                       conditions, beach_name, score_conditions(conditions))
+        if remaining is not None and remaining > PREFETCH_LEAD:
+            return True
+        if not self._take((self._openai_request_quota, 1), (self._openai_token_quota, OPENAI_TOKENS_PER_CALL)):
+            return False
+        await async_client.assess_surf_quality(conditions, beach_name, refresh=True, location=forecast.location)
+        self.assessments_refreshed += 1
+        return True
+
+    def stats(self):
+        """Counters for what the scheduler has done"""
+        return {
+            "tracked": len(self.tracker),
+            "hot": len(self.tracker.hot()),
+            "forecasts_refreshed": self.forecasts_refreshed,
+            "assessments_refreshed": self.assessments_refreshed,
+            "skipped_for_quota": self.skipped_for_quota,
+            "errors": self.errors,
+        }
+
+
+# Lookups from every session feed one popularity ranking, so the scheduler
+# prefetches what the whole process is asking for
+tracker = LookupTracker()
+scheduler = PrefetchScheduler(tracker)
+
+
+def record_lookup(location_id, beach_name=None):
+    """Count a user lookup towards the location's popularity"""
+    tracker.record(location_id, beach_name)
+
+
+def start():
+    """Start the background prefetcher unless it's turned off (safe to call on every rerun)"""
+    if PREFETCH_QUOTA_SHARE > 0:
+        scheduler.start()
+
+
+def stop():
+    scheduler.stop()
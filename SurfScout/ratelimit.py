@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import config  # noqa: F401  (loads .env)
+
+# Upstream rate limits (can be overridden in the .env file)
+WILLYWEATHER_RATE = float(os.getenv("SURFSCOUT_WILLYWEATHER_RATE", "5"))
+WILLYWEATHER_BURST = float(os.getenv("SURFSCOUT_WILLYWEATHER_BURST", "10"))
+OPENAI_RPM = float(os.getenv("SURFSCOUT_OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("SURFSCOUT_OPENAI_TPM", "30000"))
+# Tokens reserved for each completion before we know its real usage
+OPENAI_TOKENS_PER_CALL = int(os.getenv("SURFSCOUT_OPENAI_TOKENS_PER_CALL", "600"))
+# Longest a request will queue for the limiter before giving up
+RATE_LIMIT_MAX_WAIT = float(os.getenv("SURFSCOUT_RATE_LIMIT_MAX_WAIT", "30"))
+# Times a 429 response is retried after honouring its Retry-After
+RATE_LIMIT_RETRIES = int(os.getenv("SURFSCOUT_RATE_LIMIT_RETRIES", "2"))
+# Processes drawing on the same upstream quotas (server workers plus any
+# Streamlit processes). The limiters live in process memory, so each process
+# enforces an equal share of the limits above.
+RATE_LIMIT_PROCESSES = max(1, int(os.getenv("SURFSCOUT_RATE_LIMIT_PROCESSES", "1")))
+PROCESS_WILLYWEATHER_RATE = WILLYWEATHER_RATE / RATE_LIMIT_PROCESSES
+PROCESS_WILLYWEATHER_BURST = max(1.0, WILLYWEATHER_BURST / RATE_LIMIT_PROCESSES)
+PROCESS_OPENAI_RPM = OPENAI_RPM / RATE_LIMIT_PROCESSES
+PROCESS_OPENAI_TPM = OPENAI_TPM / RATE_LIMIT_PROCESSES
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would have to queue longer than the limiter allows"""
+
+
+def parse_retry_after(value, default=1.0):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Thread-safe token bucket that queues callers instead of rejecting them
+
+    Each acquire reserves its tokens up front, letting the balance go negative,
+    and then sleeps until the bucket has refilled enough to cover them. Callers
+    are therefore served roughly in arrival order at the configured rate.
+    """
+
+    def __init__(self, name, rate, capacity, max_wait=RATE_LIMIT_MAX_WAIT):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.calls = 0
+        self.tokens_used = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        """Take tokens from the bucket, returning how long the caller must wait for them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = max(-self._tokens / self.rate, self._paused_until - now, 0.0)
+            if wait > self.max_wait:
+                # Give the tokens back; this caller won't be using them
+                self._tokens += tokens
+                raise RateLimitExceeded(f"{self.name} rate limit: would have to wait {wait:.1f}s")
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available (raises RateLimitExceeded if that takes too long)"""
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Async version of acquire that yields to the event loop while queued"""
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back for seconds, e.g. after a 429 with Retry-After"""
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def settle(self, reserved, actual):
+        """Correct an earlier reservation once the real token cost is known"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + reserved - actual)
+
+    def record(self, calls=1, tokens=0):
+        """Count upstream calls made and tokens consumed"""
+        with self._lock:
+            self.calls += calls
+            self.tokens_used += tokens
+
+    def stats(self):
+        """Running counters for this upstream"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "tokens_used": self.tokens_used,
+                "throttled": self.throttled,
+                "seconds_queued": round(self.waited, 3),
+            }
+
+
+# One set of limiters per process, shared by every session, each holding this process's share
+willyweather_limiter = TokenBucket("WillyWeather", PROCESS_WILLYWEATHER_RATE, PROCESS_WILLYWEATHER_BURST)
+openai_request_limiter = TokenBucket("OpenAI requests", PROCESS_OPENAI_RPM / 60, max(1.0, PROCESS_OPENAI_RPM / 60))
+openai_token_limiter = TokenBucket(
+    "OpenAI tokens", PROCESS_OPENAI_TPM / 60, max(OPENAI_TOKENS_PER_CALL, PROCESS_OPENAI_TPM / 60))
+
+
+async def acquire_openai_async():
+    """Queue for one OpenAI request slot and an estimated share of the token budget"""
+    await openai_request_limiter.acquire_async()
+    await openai_token_limiter.acquire_async(OPENAI_TOKENS_PER_CALL)
+
+
+def record_openai(usage):
+    """Account for a finished completion using the usage block of the response"""
+    tokens = getattr(usage, "total_tokens", None) or OPENAI_TOKENS_PER_CALL
+    openai_token_limiter.settle(OPENAI_TOKENS_PER_CALL, tokens)
+    openai_request_limiter.record()
+    openai_token_limiter.record(tokens=tokens)
+
+
+def throttle_openai(error):
+    """Back every OpenAI caller off after a rate-limit error, honouring its Retry-After"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    seconds = parse_retry_after(headers.get("retry-after"))
+    openai_request_limiter.pause(seconds)
+    openai_token_limiter.pause(seconds)
+
+
+def upstream_stats():
+    """Running call and token counters for every upstream"""
+    openai = openai_request_limiter.stats()
+    openai["tokens_used"] = openai_token_limiter.tokens_used
+    return {"willyweather": willyweather_limiter.stats(), "openai": openai}
@@ -0,0 +1,147 @@
+import os
+import socket
+import threading
+from urllib.parse import unquote, urlparse
+
+import config  # noqa: F401  (loads .env)
+
+# Redis (or any server speaking its protocol, e.g. Valkey, KeyDB, Dragonfly) for shared caches
+REDIS_URL = os.getenv("SURFSCOUT_REDIS_URL", "redis://127.0.0.1:6379/0")
+REDIS_TIMEOUT = float(os.getenv("SURFSCOUT_REDIS_TIMEOUT", "1"))
+REDIS_POOL_SIZE = int(os.getenv("SURFSCOUT_REDIS_POOL_SIZE", "10"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class RedisError(Exception):
+    """An error reply from the Redis server"""
+
+
+def _encode(args):
+    """A command as a RESP array of bulk strings"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class _Connection:
+    """One RESP connection; not thread-safe, so the client hands each to one thread at a time"""
+
+    def __init__(self, host, port, timeout, username=None, password=None, db=0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.command(*(("AUTH", username, password) if username else ("AUTH", password)))
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        self.sock.sendall(_encode(args))
+        return self._read()
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Redis closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Redis closed the connection")
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length == -1 else [self._read() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply from Redis: {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisClient:
+    """Minimal thread-safe Redis client: a pool of keep-alive RESP connections
+
+    Only plain request/reply commands are supported, which is all the caches
+    need. Connection problems raise OSError (ConnectionError, socket.timeout)
+    and error replies raise RedisError.
+    """
+
+    def __init__(self, url=REDIS_URL, timeout=REDIS_TIMEOUT, pool_size=REDIS_POOL_SIZE):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported Redis URL '{url}' (expected redis://host:port/db)")
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Connection(self.host, self.port, self.timeout, self.username, self.password, self.db)
+
+    def _checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def command(self, *args):
+        """Send one command and return its reply (bulk strings come back as bytes)"""
+        conn = self._checkout()
+        try:
+            reply = conn.command(*args)
+        except RedisError:
+            # An error reply leaves the connection usable
+            self._checkin(conn)
+            raise
+        except BaseException:
+            # Anything else may leave a half-read reply behind, so the connection is dropped
+            conn.close()
+            raise
+        self._checkin(conn)
+        return reply
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def get_redis_client():
+    """Return the process-wide Redis client, created on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = RedisClient()
+    return _client
@@ -0,0 +1,161 @@
+import dataclasses
+import json
+
+# Typed, slotted views of the WillyWeather responses. Only the fields the app
+# reads are declared; everything else in the payload is skipped while decoding,
+# so multi-day forecasts take a fraction of the memory of the raw JSON dicts.
+#
+# With msgspec installed (pip install msgspec) they are msgspec Structs and JSON
+# is decoded straight into them without building intermediate dicts. Without it
+# they are slotted dataclasses built by hand from json.loads output.
+#
+# Field names follow the API's camelCase so both paths map keys one-to-one.
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if msgspec is not None:
+    # Structs are slotted and decode several times faster than dataclasses; none
+    # of these objects can form reference cycles, so they can skip the GC too
+    _Model = msgspec.Struct
+    _OPTIONS = {"gc": False, "omit_defaults": True}
+
+    def _schema(cls):
+        return cls
+else:
+    _Model = object
+    _OPTIONS = {}
+    _schema = dataclasses.dataclass(slots=True)
+
+
+@_schema
+class Location(_Model, **_OPTIONS):
+    """A WillyWeather location (search result or the location of a forecast)"""
+    id: int = 0
+    name: str | None = None
+    region: str | None = None
+    state: str | None = None
+    postcode: str | None = None
+    timeZone: str | None = None
+
+
+@_schema
+class Entry(_Model, **_OPTIONS):
+    """One forecast reading; each forecast type fills in only its own fields"""
+    dateTime: str | None = None
+    height: float | None = None
+    speed: float | None = None
+    direction: float | None = None
+    type: str | None = None
+
+
+@_schema
+class Day(_Model, **_OPTIONS):
+    entries: list[Entry] | None = None
+
+
+@_schema
+class Forecast(_Model, **_OPTIONS):
+    days: list[Day] | None = None
+
+
+@_schema
+class Forecasts(_Model, **_OPTIONS):
+    tides: Forecast | None = None
+    wind: Forecast | None = None
+    swell: Forecast | None = None
+
+
+@_schema
+class WeatherResponse(_Model, **_OPTIONS):
+    """A weather.json response; decoding fails if 'forecasts' is missing"""
+    forecasts: Forecasts
+    location: Location | None = None
+
+
+@_schema
+class _LegacySearch(_Model, **_OPTIONS):
+    # Older search responses wrapped the list of locations in {"search": [...]}
+    search: list[Location]
+
+
+if msgspec is not None:
+    DECODE_ERRORS = (msgspec.DecodeError, msgspec.ValidationError)
+
+    _weather_decoder = msgspec.json.Decoder(WeatherResponse)
+    _search_decoder = msgspec.json.Decoder(list[Location] | _LegacySearch)
+
+    def decode_weather(content):
+        """Decode weather.json bytes into a WeatherResponse"""
+        return _weather_decoder.decode(content)
+
+    def decode_search(content):
+        """Decode search.json bytes into a list of Locations"""
+        result = _search_decoder.decode(content)
+        return result.search if isinstance(result, _LegacySearch) else result
+
+    def weather_from_builtins(data):
+        """Build a WeatherResponse from plain dicts and lists (e.g. out of the forecast cache)"""
+        return msgspec.convert(data, WeatherResponse)
+
+    def to_builtins(value):
+        """Plain dicts and lists for a decoded value, ready for JSON"""
+        return msgspec.to_builtins(value)
+
+    def locations_from_builtins(data):
+        """Build a list of Locations from plain dicts (e.g. out of a shared search cache)"""
+        return msgspec.convert(data, list[Location])
+
+else:
+    DECODE_ERRORS = (ValueError, TypeError, AttributeError, KeyError)
+
+    def _location(data):
+        if data is None:
+            return None
+        return Location(data["id"], data.get("name"), data.get("region"), data.get("state"),
+                        data.get("postcode"), data.get("timeZone"))
+
+    def _forecast(data):
+        if data is None:
+            return None
+        return Forecast([
+            Day([
+                Entry(e.get("dateTime"), e.get("height"), e.get("speed"), e.get("direction"), e.get("type"))
+                for e in day.get("entries") or ()
+            ])
+            for day in data.get("days") or ()
+        ])
+
+    def weather_from_builtins(data):
+        """Build a WeatherResponse from plain dicts and lists (e.g. out of the forecast cache)"""
+        forecasts = data["forecasts"]
+        return WeatherResponse(
+            Forecasts(_forecast(forecasts.get("tides")), _forecast(forecasts.get("wind")),
+                      _forecast(forecasts.get("swell"))),
+            _location(data.get("location")),
+        )
+
+    def decode_weather(content):
+        """Decode weather.json bytes into a WeatherResponse"""
+        return weather_from_builtins(json.loads(content))
+
+    def locations_from_builtins(data):
+        """Build a list of Locations from plain dicts (e.g. out of a shared search cache)"""
+        return [_location(location) for location in data]
+
+    def decode_search(content):
+        """Decode search.json bytes into a list of Locations"""
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data["search"]
+        if not isinstance(data, list):
+            raise TypeError(f"expected a list of locations, got {type(data).__name__}")
+        return [_location(location) for location in data]
+
+    def to_builtins(value):
+        """Plain dicts and lists for a decoded value, ready for JSON"""
+        if isinstance(value, list):
+            return [to_builtins(item) for item in value]
+        return dataclasses.asdict(value) if value is not None else None
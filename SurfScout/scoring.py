@@ -0,0 +1,85 @@
+import numpy as np
+
+# Rule-based surf scoring. Every function works on numpy arrays so thousands of
+# forecast entries can be scored in one call; scalars work too.
+
+# Swell height (m) -> quality factor. Knee-high is barely surfable, 1-2.5 m is
+# ideal for most breaks and big swell closes out more often than not.
+_SWELL_HEIGHTS = [0.0, 0.3, 0.6, 1.0, 1.5, 2.5, 4.0, 6.0]
+_SWELL_FACTORS = [0.0, 0.1, 0.45, 0.8, 1.0, 1.0, 0.6, 0.2]
+
+# Wind speed (km/h) -> how much the wind direction matters
+_WIND_SPEEDS = [0.0, 5.0, 15.0, 25.0, 40.0]
+_WIND_STRENGTHS = [0.0, 0.2, 0.6, 1.0, 1.0]
+
+# Tide height (m) -> quality factor, most breaks work best around mid tide
+_TIDE_HEIGHTS = [0.0, 0.4, 0.8, 1.4, 2.0, 3.0]
+_TIDE_FACTORS = [0.5, 0.8, 1.0, 1.0, 0.7, 0.5]
+
+# Extremes of the tide cycle slow most breaks down a little
+_TIDE_TYPE_FACTORS = {"low": 0.85, "high": 0.9}
+
+# Share of the score contributed by each component once there's swell to ride
+_BASE_WEIGHT = 0.5
+_WIND_WEIGHT = 0.35
+_TIDE_WEIGHT = 0.15
+
+
+def offshore_alignment(wind_direction, swell_direction):
+    """Cosine alignment of the wind with offshore: 1 is straight offshore, -1 straight onshore
+
+    WillyWeather gives the direction wind and swell come from. We don't know
+    which way each beach faces, so the swell direction stands in for it: an
+    offshore wind blows from the opposite side.
+    """
+    offshore_direction = np.asarray(swell_direction, dtype=float) + 180.0
+    return np.cos(np.radians(np.asarray(wind_direction, dtype=float) - offshore_direction))
+
+
+def wind_factor(wind_speed, wind_direction, swell_direction):
+    """0-1 wind quality: light or offshore wind is good, strong onshore wind is bad"""
+    speed = np.asarray(wind_speed, dtype=float)
+    alignment = offshore_alignment(wind_direction, swell_direction)
+    strength = np.interp(speed, _WIND_SPEEDS, _WIND_STRENGTHS)
+    # Onshore wind costs up to the full factor, scaled by how strong it is
+    onshore_penalty = strength * (1.0 - alignment) / 2.0
+    # Very strong offshore wind makes paddling in hard
+    gale_penalty = 0.3 * np.clip((speed - 25.0) / 20.0, 0.0, 1.0) * (alignment > 0)
+    return np.clip(1.0 - onshore_penalty - gale_penalty, 0.0, 1.0)
+
+
+def tide_factor(tide_height, tide_type=None):
+    """0-1 tide quality from the tide height and (optionally) whether it's high or low"""
+    factor = np.interp(np.asarray(tide_height, dtype=float), _TIDE_HEIGHTS, _TIDE_FACTORS)
+    if tide_type is not None:
+        types = np.char.lower(np.asarray(tide_type, dtype=str))
+        for name, type_factor in _TIDE_TYPE_FACTORS.items():
+            factor = np.where(types == name, factor * type_factor, factor)
+    return factor
+
+
+def score_arrays(swell_height, swell_direction, wind_speed, wind_direction, tide_height, tide_type=None):
+    """Score arrays of conditions from 0-10 (rounded to one decimal)"""
+    swell = np.interp(np.asarray(swell_height, dtype=float), _SWELL_HEIGHTS, _SWELL_FACTORS)
+    wind = wind_factor(wind_speed, wind_direction, swell_direction)
+    tide = tide_factor(tide_height, tide_type)
+    # Without swell nothing else matters, so swell scales the whole score
+    score = 10.0 * swell * (_BASE_WEIGHT + _WIND_WEIGHT * wind + _TIDE_WEIGHT * tide)
+    return np.round(score, 1)
+
+
+def score_many(conditions_list):
+    """Score a list of Conditions at once, returning a numpy array of scores"""
+    return score_arrays(
+        [c.swell_height for c in conditions_list],
+        [c.swell_direction for c in conditions_list],
+        [c.wind_speed for c in conditions_list],
+        [c.wind_direction for c in conditions_list],
+        [c.tide_height for c in conditions_list],
+        [c.tide_type for c in conditions_list],
+    )
+
+
+def score_conditions(conditions):
+    """Score a single Conditions from 0-10"""
+    return float(score_many([conditions])[0])
@@ -0,0 +1,206 @@
+import json
+import os
+from urllib.parse import parse_qs
+
+from openai import OpenAIError
+
+import async_client
+import config  # noqa: F401  (loads .env)
+import history
+import prefetch
+from conditions import Conditions
+from deadline import Deadline, DeadlineExceeded, wait_within
+from metrics import render_prometheus
+from ratelimit import RateLimitExceeded
+from schemas import to_builtins
+from scoring import score_conditions
+from willyweather import WillyWeatherError
+
+# Headless JSON API around search, conditions and assessment. It's a plain
+# ASGI application, so run it under any ASGI server, e.g.
+#
+#     uvicorn server:app --workers 4
+#
+# Endpoints:
+#     GET  /health
+#     GET  /metrics   (Prometheus text format, per worker process)
+#     GET  /search?q=<beach name>
+#     GET  /conditions/<location_id>
+#     GET  /assess/<location_id>?beach=<beach name>
+#     POST /assess   {"conditions": {...}, "beach_name": "..."}
+#
+# Each request runs under an overall deadline split into per-stage budgets.
+# A search or conditions lookup that runs out answers 504; an explanation that
+# runs out comes back as null with "pending": true alongside the score, and is
+# cached when it arrives so asking again shortly returns it.
+
+SERVER_HOST = os.getenv("SURFSCOUT_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SURFSCOUT_SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SURFSCOUT_SERVER_WORKERS", "4"))
+
+
+class HTTPError(Exception):
+    """An error response with a status code and JSON message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+async def _send(send, status, payload, content_type):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(payload)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _send_json(send, status, body):
+    await _send(send, status, json.dumps(body).encode(), b"application/json")
+
+
+async def _read_json(receive):
+    """Read and decode the JSON request body"""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        return json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Request body must be JSON")
+
+
+def _query_param(query, name):
+    values = query.get(name)
+    if not values or not values[0].strip():
+        raise HTTPError(400, f"Missing query parameter '{name}'")
+    return values[0]
+
+
+def _location_id(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f"Invalid location id '{value}'")
+
+
+async def search(query):
+    beach_name = _query_param(query, "q")
+    locations = await wait_within(Deadline().budget("search"), async_client.search_beach(beach_name))
+    return {"locations": to_builtins(locations)}
+
+
+async def _surf_conditions(location_id, deadline):
+    # A lookup that outlives its budget still finishes and caches the forecast
+    return await wait_within(deadline.budget("conditions"), async_client.get_surf_conditions(location_id))
+
+
+async def conditions(location_id):
+    prefetch.record_lookup(_location_id(location_id))
+    conditions = await _surf_conditions(_location_id(location_id), Deadline())
+    return {"location_id": int(location_id), "conditions": conditions.to_dict(), "score": score_conditions(conditions)}
+
+
+async def assess(conditions, beach_name, deadline, location=None):
+    score = score_conditions(conditions)
+    try:
+        return await wait_within(deadline.budget("assess"),
+                                 async_client.assess_surf_quality(conditions, beach_name, score, location=location))
+    except DeadlineExceeded:
+        return {"score": score, "explanation": None, "pending": True}
+
+
+async def assess_location(location_id, query):
+    beach_name = _query_param(query, "beach")
+    prefetch.record_lookup(_location_id(location_id), beach_name)
+    deadline = Deadline()
+    # The forecast's location carries the state the assessment is filed under in the history store
+    forecast = await wait_within(deadline.budget("conditions"), async_client.get_forecast(_location_id(location_id)))
+    conditions = forecast.conditions_at()
+    assessment = await assess(conditions, beach_name, deadline, forecast.location)
+    return {"location_id": int(location_id), "conditions": conditions.to_dict(), **assessment}
+
+
+async def assess_body(receive):
+    body = await _read_json(receive)
+    if not isinstance(body, dict) or "conditions" not in body or "beach_name" not in body:
+        raise HTTPError(400, "Body must contain 'conditions' and 'beach_name'")
+    if not isinstance(body["beach_name"], str) or not body["beach_name"].strip():
+        raise HTTPError(400, "'beach_name' must be a non-empty string")
+    try:
+        conditions = Conditions.from_dict(body["conditions"])
+    except (KeyError, TypeError, ValueError, OverflowError, AttributeError):
+        raise HTTPError(400, "Malformed 'conditions'")
+    return await assess(conditions, body["beach_name"], Deadline())
+
+
+async def route(method, path, query, receive):
+    """Dispatch a request to its handler, returning the JSON body"""
+    parts = [part for part in path.split("/") if part]
+    if method == "GET":
+        if parts == ["health"]:
+            return {"status": "ok"}
+        if parts == ["search"]:
+            return await search(query)
+        if len(parts) == 2 and parts[0] == "conditions":
+            return await conditions(parts[1])
+        if len(parts) == 2 and parts[0] == "assess":
+            return await assess_location(parts[1], query)
+    elif method == "POST" and parts == ["assess"]:
+        return await assess_body(receive)
+    raise HTTPError(404, "Not found")
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            prefetch.start()
+            history.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            prefetch.stop()
+            history.stop()
+            await async_client.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    if scope["method"] == "GET" and scope["path"].rstrip("/") == "/metrics":
+        return await _send(send, 200, render_prometheus().encode(), b"text/plain; version=0.0.4; charset=utf-8")
+
+    query = parse_qs(scope.get("query_string", b"").decode())
+    try:
+        body = await route(scope["method"], scope["path"], query, receive)
+    except HTTPError as e:
+        return await _send_json(send, e.status, {"error": e.message})
+    except RateLimitExceeded as e:
+        return await _send_json(send, 503, {"error": str(e)})
+    except DeadlineExceeded as e:
+        return await _send_json(send, 504, {"error": str(e)})
+    except (WillyWeatherError, OpenAIError) as e:
+        return await _send_json(send, 502, {"error": str(e)})
+    await _send_json(send, 200, body)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Workers inherit this, so together they stay within the upstream rate limits
+    os.environ.setdefault("SURFSCOUT_RATE_LIMIT_PROCESSES", str(SERVER_WORKERS))
+    uvicorn.run("server:app", host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS)
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+
+from scoring import score_arrays
+
+# Best-session defaults (a "session" is a window of consecutive forecast steps)
+SESSION_STEP = 3600
+SESSION_HOURS = 2
+
+
+def score_matrix(forecasts, times):
+    """(beaches x times) score matrix, computed with one vectorized scoring call"""
+    samples = [forecast.sample(times) for forecast in forecasts]
+    columns = {name: np.concatenate([sample[name] for sample in samples]) for name in samples[0]}
+    return score_arrays(**columns).reshape(len(forecasts), len(times))
+
+
+def _window_sums(values, width):
+    """Sum of every run of width consecutive steps along each row"""
+    cumulative = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+    return cumulative[:, width:] - cumulative[:, :-width]
+
+
+def _window_means(scores, covered, width):
+    """Mean score of every run of width consecutive steps along each row (-inf where any step isn't covered)"""
+    means = _window_sums(np.where(covered, scores, 0.0), width) / width
+    means[_window_sums((~covered).astype(np.int64), width) > 0] = -np.inf
+    return means
+
+
+def find_best_sessions(forecasts, days=1, k=5, session_hours=SESSION_HOURS, step=SESSION_STEP, start=None):
+    """Top-k surf sessions across beaches over the next few days
+
+    forecasts maps a beach name to its forecast.SurfForecast. Returns up to k
+    dicts with the beach, session start/end (epoch seconds) and mean score,
+    best first. Sessions at the same beach never overlap.
+    """
+    if not forecasts:
+        return []
+    start = time.time() if start is None else start
+    # Align to the step so every beach is sampled at the same round times
+    start = start - start % step
+    times = np.arange(start, start + days * 86400, step, dtype=float)
+    width = max(1, int(session_hours * 3600 // step))
+    if len(times) < width:
+        return []
+
+    names = list(forecasts)
+    beaches = [forecasts[name] for name in names]
+    # Past the end of a forecast the readings are just its last ones repeated, so no session starts there
+    covered = np.stack([forecast.covers(times) for forecast in beaches])
+    means = _window_means(score_matrix(beaches, times), covered, width)
+    flat = means.ravel()
+    columns = means.shape[1]
+
+    # Each pick can suppress at most 2 * width - 1 overlapping windows at its
+    # beach, so this many candidates from a partial sort always yields k sessions
+    candidates = min(flat.size, k * (2 * width - 1))
+    top = np.argpartition(-flat, candidates - 1)[:candidates]
+    top = top[np.argsort(-flat[top], kind="stable")]
+
+    sessions = []
+    taken = {}
+    for index in top:
+        if flat[index] == -np.inf:
+            break
+        row, column = divmod(int(index), columns)
+        if any(abs(column - other) < width for other in taken.get(row, ())):
+            continue
+        taken.setdefault(row, []).append(column)
+        sessions.append({
+            "beach": names[row],
+            "start": float(times[column]),
+            "end": float(times[column] + width * step),
+            "score": round(float(flat[index]), 1),
+        })
+        if len(sessions) == k:
+            break
+    return sessions
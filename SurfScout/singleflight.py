@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce identical in-flight calls so one upstream request serves every waiter
+
+    The first caller for a key (the leader) makes the call; anyone asking for
+    the same key before it finishes waits for and shares its result or
+    exception. Waiters share a thread-safe Future, so callers on different
+    event loops or threads coalesce too.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return (future, is_leader) for key"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            self.calls += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._inflight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) unless an identical call is already in flight"""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def stats(self):
+        """Return how many upstream calls were made and how many callers piggybacked on one"""
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._inflight)}
+
+
+# async_client keys WillyWeather and OpenAI calls here so identical concurrent
+# requests share one upstream call
+inflight = SingleFlight()
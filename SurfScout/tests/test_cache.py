@@ -0,0 +1,175 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Run from SurfScout/:  python -m unittest discover tests
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.join(APP_DIR, "benchmarks"))
+
+from cache import RedisCache, SQLiteCache, TTLCache, run_blocking  # noqa: E402
+from mock_redis import start_redis  # noqa: E402
+from redis_client import RedisClient, RedisError  # noqa: E402
+from schemas import Location, locations_from_builtins, to_builtins  # noqa: E402
+
+BONDI = Location(4950, "Bondi Beach", "Sydney", "NSW", "2026", "Australia/Sydney")
+FORECAST = {"location": {"id": 4950}, "forecast": {"days": [{"entries": [{"height": 1.2}]}]}}
+
+
+class CacheBehaviour:
+    """Checks every backend must pass, used the way the app uses its caches"""
+
+    def build(self, name, ttl, encode=None, decode=None):
+        raise NotImplementedError
+
+    def test_search_results_round_trip(self):
+        searches = self.build("searches", 60, encode=to_builtins, decode=locations_from_builtins)
+        searches.set("bondi", [BONDI])
+        self.assertEqual(searches.get("bondi"), [BONDI])
+        self.assertIsNone(searches.get("manly"))
+        self.assertEqual(searches.get("manly", []), [])
+
+    def test_ttl_remaining(self):
+        cache = self.build("searches", 60)
+        cache.set("bondi", "value")
+        self.assertTrue(59 < cache.ttl_remaining("bondi") <= 60)
+        self.assertIsNone(cache.ttl_remaining("manly"))
+
+    def test_tuple_keys(self):
+        assessments = self.build("assessments", 60)
+        key = ("bondi beach", 6, "high", 3, 2, 11, 5)
+        assessments.set(key, "Clean and glassy.")
+        self.assertEqual(assessments.get(key), "Clean and glassy.")
+        self.assertIsNone(assessments.get(key[:-1] + (6,)))
+
+    def test_entries_expire(self):
+        assessments = self.build("assessments", 60)
+        assessments.set("bondi", "Short-lived", ttl=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(assessments.get("bondi"))
+        self.assertIsNone(assessments.ttl_remaining("bondi"))
+
+    def test_set_without_ttl_needs_a_default(self):
+        forecasts = self.build("forecasts", None)
+        forecasts.set("4950:swell", FORECAST, ttl=30)
+        self.assertEqual(forecasts.get("4950:swell"), FORECAST)
+        with self.assertRaises(ValueError):
+            forecasts.set("4950:wind", FORECAST)
+
+    def test_stats_and_clear(self):
+        cache = self.build("assessments", 60)
+        cache.set("bondi", "value")
+        cache.get("bondi")
+        cache.get("manly")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+        cache.clear()
+        self.assertEqual(cache.stats()["size"], 0)
+        self.assertIsNone(cache.get("bondi"))
+
+
+class TTLCacheTest(CacheBehaviour, unittest.TestCase):
+    def build(self, name, ttl, encode=None, decode=None):
+        return TTLCache(100, ttl)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(2, 60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+
+
+class SQLiteCacheTest(CacheBehaviour, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="surfscout-test-")
+        self.path = os.path.join(self.directory, "cache.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def build(self, name, ttl, encode=None, decode=None):
+        return SQLiteCache(self.path, table=name, ttl=ttl, encode=encode, decode=decode)
+
+    def test_shared_between_instances(self):
+        # A second worker process opens the same file
+        self.build("forecasts", None).set("4950:swell", FORECAST, ttl=30)
+        self.assertEqual(SQLiteCache(self.path, table="forecasts").get("4950:swell"), FORECAST)
+
+
+class RedisCacheTest(CacheBehaviour, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.url = start_redis()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.client = RedisClient(self.url)
+        self.client.command("FLUSHDB")
+
+    def tearDown(self):
+        self.client.close()
+
+    def build(self, name, ttl, encode=None, decode=None):
+        return RedisCache(self.client, name, ttl=ttl, encode=encode, decode=decode)
+
+    def test_shared_between_clients(self):
+        # Another worker process, with its own connection pool
+        self.build("forecasts", None).set("4950:swell", FORECAST, ttl=30)
+        other = RedisClient(self.url)
+        self.addCleanup(other.close)
+        self.assertEqual(RedisCache(other, "forecasts").get("4950:swell"), FORECAST)
+
+    def test_namespaces_are_separate(self):
+        searches, assessments = self.build("searches", 60), self.build("assessments", 60)
+        searches.set("bondi", "search")
+        assessments.set("bondi", "assessment")
+        searches.clear()
+        self.assertIsNone(searches.get("bondi"))
+        self.assertEqual(assessments.get("bondi"), "assessment")
+
+    def test_error_reply_keeps_the_connection(self):
+        with self.assertRaises(RedisError):
+            self.client.command("NOSUCHCOMMAND")
+        self.assertEqual(self.client.command("PING"), "PONG")
+
+    def test_unreachable_server_reads_as_empty(self):
+        down = RedisCache(RedisClient("redis://127.0.0.1:1/0", timeout=0.2), "down", ttl=60)
+        down.set("bondi", "value")
+        self.assertIsNone(down.get("bondi"))
+        self.assertIsNone(down.ttl_remaining("bondi"))
+        self.assertEqual(down.errors, 3)
+
+
+class RunBlockingTest(unittest.TestCase):
+    def test_blocking_backends_run_in_a_thread(self):
+        memory = TTLCache(10, 60)
+        directory = tempfile.mkdtemp(prefix="surfscout-test-")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        sqlite = SQLiteCache(os.path.join(directory, "cache.sqlite3"), ttl=60)
+
+        async def thread_of(caches):
+            return await run_blocking(caches, threading.get_ident)
+
+        async def main():
+            loop_thread = threading.get_ident()
+            return loop_thread, await thread_of((memory,)), await thread_of((memory, sqlite))
+
+        loop_thread, memory_thread, sqlite_thread = asyncio.run(main())
+        self.assertEqual(memory_thread, loop_thread)
+        self.assertNotEqual(sqlite_thread, loop_thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
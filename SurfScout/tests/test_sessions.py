@@ -0,0 +1,66 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Run from SurfScout/:  python -m unittest discover tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast import ForecastSeries, SurfForecast  # noqa: E402
+from schemas import Location  # noqa: E402
+from sessions import find_best_sessions  # noqa: E402
+
+HOUR = 3600
+# A step-aligned start, so session times line up with the readings below
+START = 1_800_000_000 - 1_800_000_000 % HOUR
+
+
+def series(hours, columns, types=None):
+    """A ForecastSeries with one reading per hour offset from START"""
+    timestamps = np.array([START + hour * HOUR for hour in hours], dtype=np.int64)
+    values = {column: np.full(len(hours), value, dtype=np.float32) for column, value in columns.items()}
+    return ForecastSeries(timestamps, values, None if types is None else np.array(types * len(hours), dtype=str))
+
+
+def surf_forecast(hours):
+    """Clean, offshore conditions at every reading (an empty hours list gives an empty forecast)"""
+    return SurfForecast(
+        Location(1, "Test Beach"),
+        series(hours, {"height": 1.0}, ["high"]),
+        series(hours, {"speed": 5.0, "direction": 270.0}),
+        series(hours, {"height": 1.5, "direction": 90.0}),
+    )
+
+
+class CoversTest(unittest.TestCase):
+    def test_empty_forecast_covers_nothing(self):
+        times = START + np.arange(4) * HOUR
+        self.assertFalse(surf_forecast([]).covers(times).any())
+
+    def test_partly_covered(self):
+        times = START + np.arange(6) * HOUR
+        covered = surf_forecast([0, 1, 2, 3]).covers(times)
+        self.assertEqual(covered.tolist(), [True, True, True, True, False, False])
+
+
+class FindBestSessionsTest(unittest.TestCase):
+    def test_empty_forecast_has_no_sessions(self):
+        self.assertEqual(find_best_sessions({"empty": surf_forecast([])}, days=1, start=START), [])
+
+    def test_sessions_stay_inside_a_partly_covered_forecast(self):
+        # Readings for the first 6 hours of a 24 hour search
+        sessions = find_best_sessions({"short": surf_forecast(range(6))}, days=1, start=START)
+        self.assertTrue(sessions)
+        for session in sessions:
+            self.assertGreaterEqual(session["start"], START)
+            self.assertLessEqual(session["end"], START + 6 * HOUR)
+
+    def test_empty_forecast_does_not_crowd_out_others(self):
+        forecasts = {"empty": surf_forecast([]), "full": surf_forecast(range(25))}
+        sessions = find_best_sessions(forecasts, days=1, start=START)
+        self.assertEqual({session["beach"] for session in sessions}, {"full"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import config  # noqa: F401  (loads .env)
+from cache import forecast_cache
+from schemas import (
+    DECODE_ERRORS,
+    Forecasts,
+    WeatherResponse,
+    decode_search,
+    decode_weather,
+    to_builtins,
+    weather_from_builtins,
+)
+
+# Base URL for the WillyWeather API (overridable to point at a local stand-in server)
+WILLYWEATHER_BASE_URL = os.getenv("WILLYWEATHER_BASE_URL", "https://api.willyweather.com.au/v2").rstrip("/")
+
+AUSTRALIAN_STATES = ["NSW", "QLD", "VIC", "SA", "WA", "TAS", "NT", "ACT"]
+
+SURF_FORECAST_TYPES = ("tides", "wind", "swell")
+
+# Cached forecasts are refreshed when their current entry is superseded, but never
+# kept longer than FORECAST_MAX_TTL or refetched sooner than FORECAST_MIN_TTL
+FORECAST_MAX_TTL = float(os.getenv("SURFSCOUT_FORECAST_MAX_TTL", "1800"))
+FORECAST_MIN_TTL = float(os.getenv("SURFSCOUT_FORECAST_MIN_TTL", "60"))
+
+# Days of forecast fetched per location (the full set of entries is kept)
+FORECAST_DAYS = int(os.getenv("SURFSCOUT_FORECAST_DAYS", "3"))
+
+# Used when a response doesn't say which time zone its dateTimes are in
+DEFAULT_TIMEZONE = "Australia/Sydney"
+
+REQUEST_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+}
+
+
+class WillyWeatherError(Exception):
+    """Raised when the WillyWeather API returns an error or an unexpected payload"""
+
+
+def search_url(api_key):
+    """URL of the location search endpoint"""
+    return f"{WILLYWEATHER_BASE_URL}/{api_key}/search.json"
+
+
+def search_params(beach_name):
+    """Query parameters for a location search"""
+    # 'types' parameter is not supported by the search endpoint
+    return {"query": beach_name, "limit": 5}
+
+
+def weather_url(api_key, location_id):
+    """URL of the weather forecast endpoint for a location"""
+    return f"{WILLYWEATHER_BASE_URL}/{api_key}/locations/{location_id}/weather.json"
+
+
+def weather_params(forecast_types=SURF_FORECAST_TYPES):
+    """Query parameters for a surf forecast request"""
+    # API expects a comma-separated string of forecast types, not a list
+    return {"forecasts": ",".join(forecast_types), "days": FORECAST_DAYS}
+
+
+def endpoint_name(url):
+    """Short name of the endpoint a WillyWeather URL points at, e.g. 'search' or 'weather'"""
+    return url.rsplit("/", 1)[-1].split(".")[0]
+
+
+def _forecast_key(location_id, forecast_type):
+    return f"{location_id}:{forecast_type}:{FORECAST_DAYS}"
+
+
+def location_timezone(timezone):
+    """ZoneInfo for a WillyWeather timeZone name, falling back to DEFAULT_TIMEZONE"""
+    try:
+        return ZoneInfo(timezone or DEFAULT_TIMEZONE)
+    except (ValueError, ZoneInfoNotFoundError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def entry_timestamp(entry, tz):
+    """Epoch seconds of a forecast entry's local dateTime, or None if it has none"""
+    try:
+        return datetime.strptime(entry.dateTime, "%Y-%m-%d %H:%M:%S").replace(tzinfo=tz).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def forecast_expiry(forecast, timezone, now=None):
+    """Epoch time at which a cached forecast stops being valid
+
+    That's when the next forecast entry after now takes over, bounded by
+    FORECAST_MIN_TTL and FORECAST_MAX_TTL.
+    """
+    now = time.time() if now is None else now
+    latest = now + FORECAST_MAX_TTL
+
+    if forecast:
+        tz = location_timezone(timezone)
+        for day in forecast.days or ():
+            for entry in day.entries or ():
+                timestamp = entry_timestamp(entry, tz)
+                if timestamp is not None and timestamp > now:
+                    return min(latest, max(timestamp, now + FORECAST_MIN_TTL))
+        # Every entry is in the past, so the forecast no longer covers now
+        return now + FORECAST_MIN_TTL
+    return latest
+
+
+def cached_weather(location_id, forecast_types=SURF_FORECAST_TYPES):
+    """Assemble a WeatherResponse from the forecast cache
+
+    Returns (data, missing) where missing lists the forecast types that
+    weren't cached and still need fetching.
+    """
+    data = {"location": None, "forecasts": {}}
+    missing = []
+    for forecast_type in forecast_types:
+        entry = forecast_cache.get(_forecast_key(location_id, forecast_type))
+        if entry is None:
+            missing.append(forecast_type)
+            continue
+        data["location"] = data["location"] or entry["location"]
+        data["forecasts"][forecast_type] = entry["forecast"]
+    return weather_from_builtins(data), missing
+
+
+def forecast_ttl_remaining(location_id, forecast_types=SURF_FORECAST_TYPES):
+    """Seconds until the first of a location's cached forecast types expires (None if any is missing)"""
+    remaining = [forecast_cache.ttl_remaining(_forecast_key(location_id, t)) for t in forecast_types]
+    return None if None in remaining else min(remaining)
+
+
+def cache_weather(location_id, data, forecast_types=SURF_FORECAST_TYPES):
+    """Store each requested forecast type from a WeatherResponse in the forecast cache"""
+    # Only the decoded fields are stored, so cache rows are a fraction of the raw response
+    location = to_builtins(data.location)
+    timezone = data.location.timeZone if data.location else None
+    for forecast_type in forecast_types:
+        # Types the API didn't return are cached too, so we don't keep asking for them
+        forecast = getattr(data.forecasts, forecast_type)
+        forecast_cache.set(
+            _forecast_key(location_id, forecast_type),
+            {"location": location, "forecast": to_builtins(forecast)},
+            ttl=forecast_expiry(forecast, timezone) - time.time(),
+        )
+
+
+def merge_weather(cached, fetched):
+    """Combine a partial cached WeatherResponse with freshly fetched forecast types"""
+    forecasts = Forecasts(**{
+        forecast_type: getattr(fetched.forecasts, forecast_type) or getattr(cached.forecasts, forecast_type)
+        for forecast_type in SURF_FORECAST_TYPES
+    })
+    return WeatherResponse(forecasts, fetched.location or cached.location)
+
+
+def parse_weather(content):
+    """Decode a weather.json response body into a WeatherResponse (raises WillyWeatherError)"""
+    try:
+        return decode_weather(content)
+    except DECODE_ERRORS as e:
+        raise WillyWeatherError(
+            f"Unexpected weather API response format. Could not find forecast data. ({e})") from e
+
+
+def parse_search(content):
+    """Decode a search.json response body into its Australian Locations (raises WillyWeatherError)"""
+    try:
+        locations = decode_search(content)
+    except DECODE_ERRORS as e:
+        raise WillyWeatherError(f"Unexpected API response format: {e}") from e
+    return filter_australian_locations(locations)
+
+
+def filter_australian_locations(locations):
+    """Keep the Australian locations from a list of search results"""
+    # Most locations should be in Australia already but we can filter by
+    # checking region, state, or timeZone
+    return [loc for loc in locations
+            if (loc.state in AUSTRALIAN_STATES or
+                "australia" in (loc.timeZone or "").lower())]